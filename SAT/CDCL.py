@@ -1,6 +1,15 @@
 import os
 import time
-from collections import defaultdict, deque
+
+from array import array
+
+import dimacs
+from cnf import ClauseArena, HEADER, LEARNED, DELETED, NO_REASON, decode, encode_all
+from heuristics import make_heuristic
+from restarts import make_restart_policy
+from stats import SolverStats, make_progress, profiling
+from certify import DratWriter
+from cardinality import find_amo
 
 class Cat:
     SATISFIED = 0
@@ -8,180 +17,776 @@ class Cat:
     NORMAL = 2
     COMPLETED = 3
 
+class SolveResult:
+    # Outcome of one solve() call
+    def __init__(self, status, model=None, core=None):
+        self.status = status    # Cat.SATISFIED or Cat.UNSATISFIED
+        self.model = model      # Signed DIMACS literals when satisfied
+        self.core = core        # When unsatisfied: failed assumptions (signed DIMACS), empty if the formula itself is UNSAT
+
 class Formula:
     def __init__(self):
-        self.literals = []
-        self.clauses = []
-        self.watches = defaultdict(list)
-        self.assign_stack = []
-        self.reason = {}
-        self.level = {}
+        self.arena = ClauseArena()       # Original and learned clauses, referenced by offset
+        self.values = array('b')         # Per encoded literal: 1 true, 0 false, -1 unassigned
+        self.level = array('i')          # Per variable: decision level, -1 when unassigned
+        self.reason = array('i')         # Per variable: implying clause reference, NO_REASON, or -2 - c for constraint c
+        self.watches = []                # Per encoded literal: flat (blocker, clause reference) pairs
+        self.dirty = set()               # Literals whose watch lists still hold deleted clauses
+        self.learnts = []                # References of learned clauses, periodically reduced
+        self.activity = {}               # Learned clause reference -> activity
+        self.assign_stack = array('i')   # Trail of assigned encoded literals
+        self.trail_lim = []              # Trail length at the start of each decision level
+        self.prop_head = 0               # Next trail position to propagate
         self.decision_level = 0
+        self.unsat = False
+        # Cardinality constraints: at most card_bound[c] of the literals cards[c] true.
+        # card_true[c] holds the true ones in trail order; a constraint goes on
+        # card_queue when their number reaches the bound, and propagate() then
+        # falsifies the rest.
+        self.cards = []
+        self.card_bound = array('i')
+        self.card_true = []
+        self.card_occ = {}               # Encoded literal -> constraints it occurs in (once per occurrence)
+        self.card_queue = []
+        self.explained = []              # (variable, clause reference) of reasons built from constraints
 
 class SATSolverCDCL:
-    def __init__(self):
-        self.formula = Formula()
+    def __init__(self, heuristic="vsids", restart="glucose", reduce_base=2000, reduce_increment=300, glue_lbd=2,
+                 verbose=True, seed=None, progress=None, progress_interval=1.0, profile=None, proof=None,
+                 detect_amo=False):
+        self.verbose = verbose
         self.literal_count = 0
         self.clause_count = 0
+        self.progress = progress         # Callback taking the stats (True: print to stderr), every progress_interval seconds
+        self.progress_interval = progress_interval
+        self.profile = profile           # None, "cprofile" or "sampling"; the report goes to stats.profile
+        # DRAT proof of the learned clauses: a DratWriter, a path or a binary file.
+        # It covers the clauses given to load(); cardinality constraints are refused,
+        # except those detect_amo recovers from clauses. Flushed at the end of each
+        # solve(). A writer the solver opened itself is closed by close(), or on
+        # leaving a with block.
+        self.owns_proof = proof is not None and not isinstance(proof, DratWriter)
+        self.proof = DratWriter(proof) if self.owns_proof else proof
+        self.detect_amo = detect_amo     # Turn pairwise at-most-one clauses into native constraints on load()
+        self.heuristic_name = heuristic
+        self.seed = seed                 # Randomizes the initial VSIDS order and phases
+        self.heuristic = make_heuristic(heuristic, 0, seed)
+        self.restart_name = restart
+        self.seen = bytearray()
+        # Learned clause database: reduce after reduce_base conflicts, then with
+        # the interval growing by reduce_increment; clauses with LBD <= glue_lbd are kept
+        self.reduce_base = reduce_base
+        self.reduce_increment = reduce_increment
+        self.glue_lbd = glue_lbd
+        self.clause_decay = 1.0 / 0.999
+        self.loaded = False
+        self.reset()
+
+    def reset(self):
+        # Everything that belongs to one formula: the trail, clauses and constraints,
+        # the answer, statistics and the restart and reduction schedules
+        self.formula = Formula()
+        self.result = None
+        self.model = None
+        self.stats = SolverStats()
+        self.restart_policy = make_restart_policy(self.restart_name)
+        self.assumptions = []            # Encoded literals decided first, one level each, for the current call
+        self.core = None
+        self.reduce_interval = self.reduce_base
+        self.next_reduce = self.reduce_base
+        self.clause_increment = 1.0
+        self.learned_bytes = 0
+
+    def close(self):
+        # Close the proof writer if the solver opened it; one passed in stays open
+        if self.owns_proof:
+            self.proof.close()
+            self.owns_proof = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def initialize(self, lines):
-        header_read = False
+        self.load(dimacs.parse_lines(lines))
+
+    def load(self, cnf):
+        # A second load() starts over on the new formula; a proof already holds
+        # the steps for the first one and cannot be taken back
+        if self.loaded:
+            if self.proof is not None:
+                raise ValueError("A solver writing a proof can only load one formula")
+            self.reset()
+        if cnf.cards and self.proof is not None:
+            raise ValueError("Cardinality constraints cannot be used with a DRAT proof")
+        self.loaded = True
+        if self.detect_amo:
+            cnf = find_amo(cnf)
+        self.literal_count = cnf.num_vars
+        self.clause_count = cnf.declared_clauses
+        n = self.literal_count
+        f = self.formula
+        f.values = array('b', [-1]) * (2 * n)
+        f.level = array('i', [-1]) * n
+        f.reason = array('i', [NO_REASON]) * n
+        f.watches = [array('i') for _ in range(2 * n)]
+        self.seen = bytearray(n)
+        self.heuristic = make_heuristic(self.heuristic_name, n, self.seed)
+        # Take over the loaded arena and attach its clauses in place; only units,
+        # empty clauses and clauses with repeated literals go through insert_clause
+        arena = f.arena
+        arena.data = array('i', cnf.arena.data)
+        arena.clause_count = cnf.arena.clause_count
+        data = arena.data
+        watches = f.watches
+        for cref in arena:
+            size = data[cref - 3]
+            lits = data[cref:cref + size]
+            if size >= 2:
+                distinct = set(lits)
+                if len(distinct) == size and distinct.isdisjoint([lit ^ 1 for lit in lits]):
+                    first, second = lits[0], lits[1]
+                    ws = watches[first]
+                    ws.append(second)
+                    ws.append(cref)
+                    ws = watches[second]
+                    ws.append(first)
+                    ws.append(cref)
+                    continue
+            arena.delete(cref)
+            self.insert_clause(lits)
+        for lits, bound in cnf.cards:
+            self.insert_card(lits, bound)
+
+    def reserve_vars(self, num_vars):
+        # Grow the per-variable state so that variables 0 .. num_vars - 1 exist
+        f = self.formula
+        while self.literal_count < num_vars:
+            f.values.append(-1)
+            f.values.append(-1)
+            f.level.append(-1)
+            f.reason.append(NO_REASON)
+            f.watches.append(array('i'))
+            f.watches.append(array('i'))
+            self.seen.append(0)
+            self.heuristic.add_var()
+            self.literal_count += 1
+
+    def add_clause(self, lits):
+        # Add an original clause of signed DIMACS literals, also between solve() calls
+        self.insert_clause(encode_all(lits))
+
+    def insert_clause(self, lits):
+        # add_clause on encoded literals: the solver returns to level 0 and literals
+        # fixed there are simplified away. Duplicates and tautologies are dropped.
+        f = self.formula
+        self.backtrack(0)
+        self.reserve_vars(max(lits, default=-1) // 2 + 1)
+        values = f.values
         clause = []
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('c'):
-                continue
-            if line.startswith('p'):
-                parts = line.split()
-                self.literal_count = int(parts[2])
-                self.clause_count = int(parts[3])
-                self.formula.literals = [-1] * (self.literal_count + 1)
-                header_read = True
-                continue
-            for lit_str in line.split():
-                literal = int(lit_str)
-                if literal == 0:
-                    self.formula.clauses.append(clause)
-                    if len(clause) >= 1:
-                        self.formula.watches[clause[0]].append(clause)
-                    if len(clause) >= 2:
-                        self.formula.watches[clause[1]].append(clause)
-                    clause = []
+        shortened = False
+        for lit in lits:
+            if values[lit] == 1 or lit ^ 1 in clause:
+                return
+            if values[lit] == -1 and lit not in clause:
+                clause.append(lit)
+            elif values[lit] == 0:
+                shortened = True
+        if shortened and self.proof is not None:
+            self.proof.add(clause)
+        if not clause:
+            f.unsat = True
+            return
+        if len(clause) == 1:
+            self.assign(clause[0], 0, NO_REASON)
+            return
+        self.attach(f.arena.add(clause))
+
+    def add_card(self, lits, bound):
+        # Add the constraint "at most bound of lits true" (signed DIMACS literals;
+        # one listed twice counts twice), also between solve() calls. A DRAT proof
+        # cannot justify the clauses it explains with, so not while writing one.
+        if self.proof is not None:
+            raise ValueError("Cardinality constraints cannot be used with a DRAT proof")
+        self.insert_card(encode_all(lits), bound)
+
+    def insert_card(self, lits, bound):
+        # add_card on encoded literals and without the proof check, also for the
+        # constraints find_amo recovers, whose explanations are the pairwise clauses
+        # they replace. Literals fixed at level 0 are simplified away and a
+        # complementary pair always counts one. Bounds of zero or one less than the
+        # size become clauses.
+        f = self.formula
+        self.backtrack(0)
+        self.reserve_vars(max(lits, default=-1) // 2 + 1)
+        values = f.values
+        counts = {}
+        for lit in lits:
+            if values[lit] == 1:
+                bound -= 1
+            elif values[lit] == -1:
+                if counts.get(lit ^ 1):
+                    counts[lit ^ 1] -= 1
+                    bound -= 1
                 else:
-                    clause.append(literal)
-        if clause:
-            self.formula.clauses.append(clause)
-            if len(clause) >= 1:
-                self.formula.watches[clause[0]].append(clause)
-            if len(clause) >= 2:
-                self.formula.watches[clause[1]].append(clause)
+                    counts[lit] = counts.get(lit, 0) + 1
+        remaining = [lit for lit, count in counts.items() for _ in range(count)]
+        if bound < 0:
+            f.unsat = True
+        elif bound >= len(remaining):
+            return
+        elif bound == 0:
+            for lit in remaining:
+                if values[lit] == -1:
+                    self.assign(lit ^ 1, 0, NO_REASON)
+        elif bound == len(remaining) - 1 and len(set(remaining)) == len(remaining):
+            self.insert_clause([lit ^ 1 for lit in remaining])
+        else:
+            c = len(f.cards)
+            f.cards.append(array('i', remaining))
+            f.card_bound.append(bound)
+            f.card_true.append([])
+            for lit in remaining:
+                f.card_occ.setdefault(lit, array('i')).append(c)
+
+    def attach(self, cref):
+        f = self.formula
+        first = f.arena.data[cref]
+        second = f.arena.data[cref + 1]
+        ws = f.watches[first]
+        ws.append(second)
+        ws.append(cref)
+        ws = f.watches[second]
+        ws.append(first)
+        ws.append(cref)
+
+    def set_phases(self, lits):
+        # Preferred signs for decisions, from encoded literals such as the best
+        # assignment of a local search run; phase saving takes over from there
+        self.reserve_vars(max(lits, default=-1) // 2 + 1)
+        for lit in lits:
+            self.heuristic.set_phase(lit >> 1, lit & 1)
 
     def pick_branching_variable(self):
-        for i in range(1, self.literal_count + 1):
-            if self.formula.literals[i] == -1:
-                return i
-        return None
+        # Returns the decision literal, or None when every variable is assigned
+        return self.heuristic.pick(self.formula.values)
 
     def value(self, lit):
-        val = self.formula.literals[abs(lit)]
-        if val == -1:
-            return -1
-        return val if lit > 0 else 1 - val
+        return self.formula.values[lit]
 
     def assign(self, lit, level, reason):
-        var = abs(lit)
-        val = 1 if lit > 0 else 0
-        self.formula.literals[var] = val
-        self.formula.assign_stack.append((lit, level))
-        self.formula.level[var] = level
-        self.formula.reason[var] = reason
+        f = self.formula
+        var = lit >> 1
+        f.values[lit] = 1
+        f.values[lit ^ 1] = 0
+        f.assign_stack.append(lit)
+        f.level[var] = level
+        f.reason[var] = reason
+        if f.card_occ:
+            occ = f.card_occ.get(lit)
+            if occ is not None:
+                bound = f.card_bound
+                for c in occ:
+                    true = f.card_true[c]
+                    true.append(lit)
+                    if len(true) >= bound[c]:
+                        f.card_queue.append(c)
 
-    def propagate(self):
-        queue = deque([lit for lit, val in enumerate(self.formula.literals) if val != -1])
+    def propagate_cards(self):
+        # Counter-based propagation of the queued constraints: at the bound, every
+        # unassigned literal is made false; past it, the constraint is in conflict.
+        # Returns the reference of a conflict clause, or None.
+        f = self.formula
+        values = f.values
+        queue = f.card_queue
         while queue:
-            lit = queue.popleft()
-            neg_lit = -lit
-            watch_list = self.formula.watches[neg_lit][:]
-            for clause in watch_list:
-                if lit not in clause and neg_lit not in clause:
+            c = queue.pop()
+            if len(f.card_true[c]) > f.card_bound[c]:
+                queue.clear()
+                return self.explain(c)
+            reason = -2 - c
+            for lit in f.cards[c]:
+                if values[lit] == -1:
+                    self.assign(lit ^ 1, f.decision_level, reason)
+        return None
+
+    def explain(self, c, implied=None):
+        # Reason clause of constraint c, built only when conflict analysis asks for
+        # it: the literal it implied first (none for a conflict), then the
+        # negations of its true literals. The clause goes into the arena unwatched.
+        # A conflict clause is deleted at once; the reason for implied replaces
+        # the constraint reference until backtracking unassigns it.
+        f = self.formula
+        lits = [] if implied is None else [implied]
+        lits.extend(lit ^ 1 for lit in f.card_true[c])
+        cref = f.arena.add(lits)
+        if implied is None:
+            f.arena.delete(cref)
+        else:
+            f.reason[implied >> 1] = cref
+            f.explained.append((implied >> 1, cref))
+        return cref
+
+    def reason_clause(self, lit):
+        # Clause reference of the reason of the true literal lit
+        cref = self.formula.reason[lit >> 1]
+        return cref if cref >= 0 else self.explain(-2 - cref, lit)
+
+    def propagate(self):
+        # Two-watched-literal propagation over the unprocessed part of the trail.
+        # The watched literals of a clause are always its first two literals.
+        # Cardinality constraints that reached their bound go first.
+        # Returns the reference of a conflicting clause, or None.
+        f = self.formula
+        data = f.arena.data
+        values = f.values
+        watches = f.watches
+        trail = f.assign_stack
+        card_queue = f.card_queue
+        level = f.decision_level
+        start = f.prop_head
+        while f.prop_head < len(trail) or card_queue:
+            if card_queue:
+                conflict = self.propagate_cards()
+                if conflict is not None:
+                    self.stats.propagations += f.prop_head - start
+                    f.prop_head = len(trail)
+                    return conflict
+                continue
+            false_lit = trail[f.prop_head] ^ 1
+            f.prop_head += 1
+            if false_lit in f.dirty:
+                self.clean_watches(false_lit)
+            ws = watches[false_lit]
+            i = j = 0
+            n = len(ws)
+            while i < n:
+                blocker = ws[i]
+                cref = ws[i + 1]
+                i += 2
+                if values[blocker] == 1:
+                    ws[j] = blocker
+                    ws[j + 1] = cref
+                    j += 2
+                    continue
+                first = data[cref]
+                if first == false_lit:
+                    first = data[cref + 1]
+                    data[cref] = first
+                    data[cref + 1] = false_lit
+                if first != blocker and values[first] == 1:
+                    ws[j] = first
+                    ws[j + 1] = cref
+                    j += 2
                     continue
-                found_new_watch = False
-                for alt in clause:
-                    if alt != lit and alt != neg_lit and self.value(alt) != 0:
-                        self.formula.watches[alt].append(clause)
-                        self.formula.watches[neg_lit].remove(clause)
-                        found_new_watch = True
+                for k in range(cref + 2, cref + data[cref - 3]):
+                    alt = data[k]
+                    if values[alt] != 0:
+                        data[cref + 1] = alt
+                        data[k] = false_lit
+                        w = watches[alt]
+                        w.append(first)
+                        w.append(cref)
                         break
-                if not found_new_watch:
-                    unassigned = [x for x in clause if self.value(x) == -1]
-                    if not unassigned:
-                        if all(self.value(x) == 0 for x in clause):
-                            return clause  # conflict
-                    elif len(unassigned) == 1:
-                        u = unassigned[0]
-                        self.assign(u, self.formula.decision_level, clause)
-                        queue.append(u)
+                else:
+                    ws[j] = first
+                    ws[j + 1] = cref
+                    j += 2
+                    if values[first] == 0:
+                        while i < n:
+                            ws[j] = ws[i]
+                            j += 1
+                            i += 1
+                        del ws[j:]
+                        self.stats.propagations += f.prop_head - start
+                        f.prop_head = len(trail)
+                        return cref  # conflict
+                    self.assign(first, level, cref)
+            del ws[j:]
+        self.stats.propagations += f.prop_head - start
         return None
 
     def backtrack(self, level):
-        while self.formula.assign_stack:
-            lit, lvl = self.formula.assign_stack[-1]
-            if lvl <= level:
-                break
-            self.formula.assign_stack.pop()
-            var = abs(lit)
-            self.formula.literals[var] = -1
-            del self.formula.level[var]
-            del self.formula.reason[var]
-
-    def analyze_conflict(self, conflict_clause):
-        learned = set()
-        seen = set()
+        f = self.formula
+        if f.decision_level <= level:
+            return
+        values = f.values
+        trail = f.assign_stack
+        on_unassign = self.heuristic.on_unassign
+        card_occ = f.card_occ
+        lim = f.trail_lim[level]
+        for lit in trail[lim:]:
+            var = lit >> 1
+            values[lit] = -1
+            values[lit ^ 1] = -1
+            f.level[var] = -1
+            f.reason[var] = NO_REASON
+            on_unassign(var, lit)
+            if card_occ and lit in card_occ:
+                # The literals unassigned here are the last ones of each list
+                for c in card_occ[lit]:
+                    f.card_true[c].pop()
+        f.card_queue.clear()
+        if f.explained:
+            kept = []
+            for var, cref in f.explained:
+                if f.level[var] == -1:
+                    f.arena.delete(cref)
+                else:
+                    kept.append((var, cref))
+            f.explained = kept
+        del trail[lim:]
+        del f.trail_lim[level:]
+        f.prop_head = lim
+        f.decision_level = level
+
+    def analyze_conflict(self, conflict):
+        # First-UIP analysis: resolve backwards along the trail until exactly one
+        # literal of the current level is left, giving an asserting clause
+        f = self.formula
+        data = f.arena.data
+        seen = self.seen
+        level = f.level
+        reason = f.reason
+        trail = f.assign_stack
+        bump = self.heuristic.bump
+        current_level = f.decision_level
+        learned = [None]  # Slot for the asserting literal
         path_count = 0
-        current_level = self.formula.decision_level
-        queue = list(conflict_clause)
-        while queue:
-            lit = queue.pop()
-            var = abs(lit)
-            if var in seen or self.formula.level.get(var, -1) != current_level:
-                continue
-            seen.add(var)
-            reason = self.formula.reason.get(var, [])
-            for l in reason:
-                if abs(l) not in seen:
-                    queue.append(l)
-            path_count += 1
-            if path_count == 1:
-                learned.add(-lit)
-        learned_clause = list(learned)
+        index = len(trail) - 1
+        cref = conflict
+        start = 0
+        while True:
+            if data[cref - 2] & LEARNED:
+                self.bump_clause(cref)
+            for k in range(cref + start, cref + data[cref - 3]):
+                q = data[k]
+                var = q >> 1
+                if not seen[var] and level[var] > 0:
+                    seen[var] = 1
+                    bump(var)
+                    if level[var] >= current_level:
+                        path_count += 1
+                    else:
+                        learned.append(q)
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            var = p >> 1
+            seen[var] = 0
+            path_count -= 1
+            if path_count == 0:
+                break
+            cref = reason[var]
+            if cref < NO_REASON:
+                cref = self.explain(-2 - cref, p)
+            start = 1  # The first literal of a reason is the one it implied
+        learned[0] = p ^ 1
+
+        learned = self.minimize(learned)
+
         backtrack_level = 0
-        for lit in learned_clause:
-            lvl = self.formula.level.get(abs(lit), 0)
-            if lvl != current_level:
-                backtrack_level = max(backtrack_level, lvl)
-        return learned_clause, backtrack_level
+        if len(learned) > 1:
+            # The watch on learned[1] must be the last literal to become unassigned
+            best = 1
+            for k in range(2, len(learned)):
+                if level[learned[k] >> 1] > level[learned[best] >> 1]:
+                    best = k
+            learned[1], learned[best] = learned[best], learned[1]
+            backtrack_level = level[learned[1] >> 1]
+        return learned, backtrack_level
 
-    def cdcl(self):
-        while True:
-            conflict = self.propagate()
-            if conflict:
-                if self.formula.decision_level == 0:
-                    self.show_result(self.formula, Cat.UNSATISFIED)
-                    return Cat.COMPLETED
-                learned_clause, back_level = self.analyze_conflict(conflict)
-                self.formula.clauses.append(learned_clause)
-                self.formula.watches[learned_clause[0]].append(learned_clause)
-                if len(learned_clause) > 1:
-                    self.formula.watches[learned_clause[1]].append(learned_clause)
-                self.backtrack(back_level)
-                self.formula.decision_level = back_level
-                self.assign(learned_clause[0], back_level, learned_clause)
+    def analyze_final(self, p):
+        # Assumption p is false: collect the assumptions it was derived from by
+        # walking the trail back through the reasons
+        f = self.formula
+        data = f.arena.data
+        seen = self.seen
+        level = f.level
+        reason = f.reason
+        trail = f.assign_stack
+        core = [p]
+        if level[p >> 1] == 0:
+            return core
+        seen[p >> 1] = 1
+        for i in range(len(trail) - 1, f.trail_lim[0] - 1, -1):
+            x = trail[i]
+            var = x >> 1
+            if not seen[var]:
+                continue
+            if reason[var] == NO_REASON:
+                core.append(x)  # Decisions below the assumption levels are assumptions
+            else:
+                cref = self.reason_clause(x)
+                for k in range(cref + 1, cref + data[cref - 3]):
+                    if level[data[k] >> 1] > 0:
+                        seen[data[k] >> 1] = 1
+            seen[var] = 0
+        return core
+
+    def minimize(self, learned):
+        # Recursive minimization: drop literals whose reasons are implied by the
+        # other literals of the clause. Levels are abstracted into a bitmask so
+        # that paths through levels absent from the clause are cut off early.
+        f = self.formula
+        seen = self.seen
+        level = f.level
+        reason = f.reason
+        abstract = 0
+        for q in learned[1:]:
+            abstract |= 1 << (level[q >> 1] & 31)
+        to_clear = learned[1:]
+        kept = [learned[0]]
+        for q in learned[1:]:
+            if reason[q >> 1] == NO_REASON or not self.lit_redundant(q, abstract, to_clear):
+                kept.append(q)
+        for q in to_clear:
+            seen[q >> 1] = 0
+        return kept
+
+    def lit_redundant(self, p, abstract, to_clear):
+        f = self.formula
+        data = f.arena.data
+        seen = self.seen
+        level = f.level
+        reason = f.reason
+        stack = [p]
+        top = len(to_clear)
+        while stack:
+            cref = self.reason_clause(stack.pop() ^ 1)
+            for k in range(cref + 1, cref + data[cref - 3]):
+                q = data[k]
+                var = q >> 1
+                if seen[var] or level[var] == 0:
+                    continue
+                if reason[var] != NO_REASON and (1 << (level[var] & 31)) & abstract:
+                    seen[var] = 1
+                    stack.append(q)
+                    to_clear.append(q)
+                else:
+                    for r in to_clear[top:]:
+                        seen[r >> 1] = 0
+                    del to_clear[top:]
+                    return False
+        return True
+
+    def compute_lbd(self, clause):
+        # Literal block distance: number of distinct decision levels in the clause
+        level = self.formula.level
+        return len({level[q >> 1] for q in clause})
+
+    def add_learned(self, lits, lbd):
+        f = self.formula
+        cref = f.arena.add(lits, learned=True, lbd=lbd)
+        f.learnts.append(cref)
+        f.activity[cref] = 0.0
+        self.attach(cref)
+        self.learned_bytes += (len(lits) + HEADER) * f.arena.data.itemsize
+        stats = self.stats
+        stats.peak_learned_bytes = max(stats.peak_learned_bytes, self.learned_bytes)
+        stats.peak_learned_clauses = max(stats.peak_learned_clauses, len(f.learnts))
+        return cref
+
+    def bump_clause(self, cref):
+        activity = self.formula.activity
+        activity[cref] += self.clause_increment
+        if activity[cref] > 1e20:
+            for c in activity:
+                activity[c] *= 1e-20
+            self.clause_increment *= 1e-20
+
+    def reduce_db(self):
+        # Keep glue clauses, binary clauses and clauses that are the reason for a
+        # current assignment; of the rest, delete the worse half by (LBD, activity).
+        # Deleted clauses stay in their two watch lists until those are next visited.
+        start = time.perf_counter()
+        f = self.formula
+        arena = f.arena
+        data = arena.data
+        reason = f.reason
+        activity = f.activity
+        learnts = sorted(f.learnts, key=lambda c: (data[c - 1], -activity[c]))
+        half = len(learnts) // 2
+        kept = learnts[:half]
+        for cref in learnts[half:]:
+            if data[cref - 1] <= self.glue_lbd or data[cref - 3] == 2 or reason[data[cref] >> 1] == cref:
+                kept.append(cref)
+            else:
+                if self.proof is not None:
+                    self.proof.delete(data[cref:cref + data[cref - 3]])
+                f.dirty.add(data[cref])
+                f.dirty.add(data[cref + 1])
+                self.learned_bytes -= (data[cref - 3] + HEADER) * data.itemsize
+                arena.delete(cref)
+                del activity[cref]
+        f.learnts = kept
+        self.stats.reductions += 1
+        self.reduce_interval += self.reduce_increment
+        self.next_reduce = self.stats.conflicts + self.reduce_interval
+        if arena.wasted * 2 > len(data):
+            self.collect_garbage()
+        self.stats.add_time("reduce", time.perf_counter() - start)
+
+    def clean_watches(self, lit):
+        f = self.formula
+        data = f.arena.data
+        ws = f.watches[lit]
+        j = 0
+        for i in range(0, len(ws), 2):
+            if not data[ws[i + 1] - 2] & DELETED:
+                ws[j] = ws[i]
+                ws[j + 1] = ws[i + 1]
+                j += 2
+        del ws[j:]
+        f.dirty.discard(lit)
+
+    def collect_garbage(self):
+        # Compact the arena once deleted clauses hold most of it and rewrite every
+        # clause reference: watches, reasons and the learned clause list
+        f = self.formula
+        for lit in list(f.dirty):
+            self.clean_watches(lit)
+        remap = f.arena.compact()
+        for ws in f.watches:
+            for k in range(1, len(ws), 2):
+                ws[k] = remap[ws[k]]
+        reason = f.reason
+        for lit in f.assign_stack:
+            var = lit >> 1
+            if reason[var] >= 0:
+                reason[var] = remap[reason[var]]
+        f.learnts = [remap[c] for c in f.learnts]
+        f.explained = [(var, remap[c]) for var, c in f.explained]
+        f.activity = {remap[c]: a for c, a in f.activity.items()}
+
+    def restart(self):
+        # Learned clauses, activities and saved phases all survive a restart
+        self.backtrack(0)
+        self.restart_policy.on_restart()
+        self.stats.restarts += 1
+
+    def cdcl(self, progress=None):
+        f = self.formula
+        stats = self.stats
+        if f.unsat:
+            self.core = []
+            self.show_result(f, Cat.UNSATISFIED)
+            return Cat.COMPLETED
+        # Time per phase is summed in locals and added to the stats on the way out
+        clock = time.perf_counter
+        propagate_time = analyze_time = decide_time = 0.0
+        try:
+            while True:
+                if progress is not None:
+                    progress.tick()
+                start = clock()
+                conflict = self.propagate()
+                now = clock()
+                propagate_time += now - start
+                start = now
+                if conflict:
+                    if f.decision_level == 0:
+                        f.unsat = True
+                        if self.proof is not None:
+                            self.proof.add([])
+                        self.core = []
+                        self.show_result(f, Cat.UNSATISFIED)
+                        return Cat.COMPLETED
+                    learned_clause, back_level = self.analyze_conflict(conflict)
+                    self.heuristic.decay()
+                    lbd = self.compute_lbd(learned_clause)
+                    self.clause_increment *= self.clause_decay
+                    stats.conflicts += 1
+                    stats.on_learned(len(learned_clause), lbd)
+                    self.restart_policy.on_conflict(lbd)
+                    self.backtrack(back_level)
+                    if self.proof is not None:
+                        self.proof.add(learned_clause)
+                    if len(learned_clause) > 1:
+                        self.assign(learned_clause[0], back_level, self.add_learned(learned_clause, lbd))
+                    else:
+                        self.assign(learned_clause[0], 0, NO_REASON)
+                    analyze_time += clock() - start
+                else:
+                    if self.restart_policy.should_restart():
+                        self.restart()
+                    if stats.conflicts >= self.next_reduce:
+                        self.reduce_db()
+                    start = clock()
+                    if not self.decide():
+                        return Cat.COMPLETED
+                    decide_time += clock() - start
+        finally:
+            stats.add_time("propagate", propagate_time)
+            stats.add_time("analyze", analyze_time)
+            stats.add_time("decide", decide_time)
+
+    def decide(self):
+        # Open a new decision level; False once the search is over (all variables
+        # assigned, or an assumption turned out false)
+        f = self.formula
+        # Assumptions are decided first, one per level; one that already
+        # holds gets an empty level so levels and assumptions stay aligned
+        lit = None
+        while f.decision_level < len(self.assumptions):
+            p = self.assumptions[f.decision_level]
+            if f.values[p] == 1:
+                f.trail_lim.append(len(f.assign_stack))
+                f.decision_level += 1
+            elif f.values[p] == 0:
+                self.core = [decode(lit) for lit in self.analyze_final(p)]
+                self.show_result(f, Cat.UNSATISFIED)
+                return False
             else:
-                var = self.pick_branching_variable()
-                if var is None:
-                    self.show_result(self.formula, Cat.SATISFIED)
-                    return Cat.COMPLETED
-                self.formula.decision_level += 1
-                self.assign(var, self.formula.decision_level, [])
+                lit = p
+                break
+        if lit is None:
+            lit = self.pick_branching_variable()
+        if lit is None:
+            self.show_result(f, Cat.SATISFIED)
+            return False
+        self.stats.decisions += 1
+        f.trail_lim.append(len(f.assign_stack))
+        f.decision_level += 1
+        self.assign(lit, f.decision_level, NO_REASON)
+        return True
 
     def show_result(self, f, result):
+        # Record the outcome (model as signed DIMACS literals) and print it if verbose
+        self.result = result
         if result == Cat.SATISFIED:
-            print("SAT")
-            output = []
-            for i in range(1, self.literal_count + 1):
-                val = f.literals[i]
-                if val == -1:
-                    output.append(str(i))
-                else:
-                    output.append(str(i if val == 1 else -i))
-            print(" ".join(output) + " 0")
+            self.model = []
+            for i in range(self.literal_count):
+                val = f.values[2 * i]
+                self.model.append(-(i + 1) if val == 0 else i + 1)
+            if self.verbose:
+                print("SAT")
+                print(" ".join(map(str, self.model)) + " 0")
         else:
-            print("UNSAT")
+            self.model = None
+            if self.verbose:
+                print("UNSAT")
 
-    def solve(self):
-        result = self.cdcl()
+    def solve(self, assumptions=()):
+        # Solve under assumptions (signed DIMACS literals that hold for this call
+        # only). Learned clauses, activities and phases carry over to the next call.
+        self.backtrack(0)
+        self.assumptions = encode_all(assumptions)
+        self.reserve_vars(max(self.assumptions, default=-1) // 2 + 1)
+        self.core = None
+        start = time.perf_counter()
+        base = self.stats.solve_time
+        with profiling(self.profile, self.stats):
+            result = self.cdcl(make_progress(self.progress, self.stats, self.progress_interval))
+        self.stats.solve_time = base + time.perf_counter() - start
+        if self.proof is not None:
+            self.proof.flush()
         if result == Cat.NORMAL:
             self.show_result(self.formula, Cat.UNSATISFIED)
+        return SolveResult(self.result, self.model, self.core)
 
 def main():
     folder = os.getcwd()
@@ -196,12 +801,13 @@ def main():
         start_time = time.time()
 
         try:
-            with open(os.path.join(folder, filename), 'r') as file:
-                lines = file.readlines()
-
-            solver = SATSolverCDCL()
-            solver.initialize(lines)
-            solver.solve()
+            with SATSolverCDCL() as solver:
+                solver.load(dimacs.load(os.path.join(folder, filename)))
+                solver.solve()
+            stats = solver.stats
+            print(f"Peak learned clauses: {stats.peak_learned_clauses} "
+                  f"({stats.peak_learned_bytes / 1024:.1f} KiB), reductions: {stats.reductions}, restarts: {stats.restarts}")
+            print(stats.summary())
         except Exception as e:
             print(f"Error processing {filename}: {e}")
 
@@ -1,73 +1,231 @@
 import os
+import sys
 import time
+import heapq
 
-def is_pure_literal(literal, formula):
-    opposite = -literal
-    for clause in formula:
-        if opposite in clause:
-            return False
-    return True
+import dimacs
+from cnf import decode
+from stats import SolverStats, make_progress, profiling
+
+# Result status of dp_solver
+SAT = "SAT"
+UNSAT = "UNSAT"
+ABORTED = "ABORTED"
+
+DEFAULT_MAX_CLAUSES = 500000
+DEFAULT_MAX_MEMORY = 1 << 30  # Bytes held by the clause store
+
+# python DP.py --regression: seeded instances that must be answered within
+# REGRESSION_SECONDS each. Random 3-SAT with 30 variables and 120 clauses took
+# about 45 seconds while resolvents were only checked against short occurrence lists.
+REGRESSION_SECONDS = 10.0
+CLI_TIME_LIMIT = 60.0          # Seconds per file for python DP.py before ABORTED
+
+def literal_bit(literal):
+    # Bit of literal in a clause mask: 2 * var for var, 2 * var + 1 for -var
+    return 1 << (2 * abs(literal) + (literal < 0))
 
-def find_pure_literals(formula):
-    literals = set(l for clause in formula for l in clause)
-    return [l for l in literals if is_pure_literal(l, formula)]
+def clause_mask(clause):
+    mask = 0
+    for literal in clause:
+        mask |= literal_bit(literal)
+    return mask
 
-def resolve(clause1, clause2, literal):
-    if literal not in clause1 or -literal not in clause2:
-        return None
-    new_clause = (set(clause1) | set(clause2)) - {literal, -literal}
-    return list(new_clause)
+class ClauseIndex:
+    # Clause store with occurrence lists that are kept up to date on every change.
+    # Clauses are frozensets, so duplicates are found by hashing. Every clause also
+    # has a bit mask of its literals, which makes a subset test one integer
+    # operation; insert() keeps the store free of subsumed clauses.
+    def __init__(self, num_vars):
+        self.clauses = {}             # Clause -> mask
+        self.occurs = {}              # Literal -> {clause: mask} of the clauses containing it
+        self.watches = {}             # Literal -> {clause: mask}, each clause under one of its literals
+        self.memory = 0               # Approximate bytes held by the clauses
+        self.changed = set()          # Variables whose occurrence counts changed
+        self.units = []               # Unit clauses, possibly already removed
+        self.empty = False
+        self.even = int("01" * (num_vars + 1), 2)   # The positive literal bits
 
-def apply_resolution(formula, literal):
-    pos_clauses = [c for c in formula if literal in c]
-    neg_clauses = [c for c in formula if -literal in c]
-    new_formula = []
+    def add(self, clause, mask):
+        self.clauses[clause] = mask
+        self.memory += sys.getsizeof(clause)
+        if len(clause) == 1:
+            self.units.append(clause)
+        for literal in clause:
+            self.occurs.setdefault(literal, {})[clause] = mask
+            self.changed.add(abs(literal))
+        watch = min(clause, key=lambda l: len(self.watches.get(l, ())))
+        self.watches.setdefault(watch, {})[clause] = mask
 
-    for clause in formula:
-        if literal in clause or -literal in clause:
+    def remove(self, clause):
+        if self.clauses.pop(clause, None) is None:
+            return
+        self.memory -= sys.getsizeof(clause)
+        for literal in clause:
+            del self.occurs[literal][clause]
+            self.watches.get(literal, {}).pop(clause, None)
+            self.changed.add(abs(literal))
+
+    def occurrences(self, literal):
+        return self.occurs.get(literal, {})
+
+    def insert(self, clause, mask=None):
+        # Add clause unless a stored clause subsumes it, and remove the stored
+        # clauses it subsumes. A subsuming clause is watched by one of the literals
+        # of clause, so their watch lists hold every candidate, once; a subsumed
+        # clause contains all of them, so the shortest occurrence list is enough.
+        if not clause:
+            self.empty = True
+            return
+        if clause in self.clauses:
+            return
+        if mask is None:
+            mask = clause_mask(clause)
+        outside = ~mask
+        watches = self.watches
+        for literal in clause:
+            if literal in watches:
+                for other in watches[literal].values():
+                    if not other & outside:
+                        return
+        self.add(clause, mask)
+        occurrences = min((self.occurrences(l) for l in clause), key=len)
+        for other, other_mask in list(occurrences.items()):
+            if other_mask & mask == mask and other_mask != mask:
+                self.remove(other)
+
+def assign(index, literal, eliminated):
+    # Fix literal to true: satisfied clauses go, falsified literals are removed
+    eliminated.append((abs(literal), literal > 0, None))
+    for clause in list(index.occurrences(literal)):
+        index.remove(clause)
+    for clause in list(index.occurrences(-literal)):
+        if clause in index.clauses:  # Not yet removed as subsumed by a shortened clause
+            index.remove(clause)
+            index.insert(clause - {-literal})
+
+def eliminate(index, var, eliminated, max_clauses, deadline, stats):
+    # Replace all clauses on var by their non-tautological, non-subsumed
+    # resolvents. Returns False if that would exceed max_clauses, or the deadline
+    # passes (the index is then left half done). Resolvents are built as masks
+    # first, which rules out tautologies and duplicates without creating the clause.
+    start = time.perf_counter()
+    pos = list(index.occurrences(var).items())
+    neg = list(index.occurrences(-var).items())
+    keep = ~(literal_bit(var) | literal_bit(-var))
+    even = index.even
+    resolvents = {}               # Mask -> the pair of clauses it comes from
+    limit = max_clauses - len(index.clauses) + len(pos) + len(neg)
+    generated = 0
+    for c1, m1 in pos:
+        if deadline is not None and time.perf_counter() > deadline:
+            stats.resolvents += generated
+            return False
+        for c2, m2 in neg:
+            mask = (m1 | m2) & keep
+            if mask & (mask >> 1) & even:
+                continue  # Tautology
+            generated += 1
+            if mask not in resolvents:
+                resolvents[mask] = (c1, c2)
+                if len(resolvents) > limit:
+                    stats.resolvents += generated
+                    return False
+    stats.resolvents += generated
+    stats.eliminated += 1
+    for clause, _ in pos + neg:
+        index.remove(clause)
+    eliminated.append((var, [c for c, _ in pos], [c for c, _ in neg]))
+    now = time.perf_counter()
+    stats.add_time("resolve", now - start)
+    clauses = [((c1 | c2) - {var, -var}, mask) for mask, (c1, c2) in resolvents.items()]
+    for i, (clause, mask) in enumerate(sorted(clauses, key=lambda item: len(item[0]))):
+        if i % 1024 == 0 and deadline is not None and time.perf_counter() > deadline:
+            return False
+        index.insert(clause, mask)
+    stats.add_time("subsume", time.perf_counter() - now)
+    return True
+
+def extend_model(num_vars, eliminated):
+    # Undo the eliminations in reverse order: var is made true exactly when one
+    # of its positive clauses is not satisfied by its other literals
+    values = [True] * (num_vars + 1)
+    for var, pos, neg in reversed(eliminated):
+        if neg is None:
+            values[var] = pos  # Fixed by a unit clause or as a pure literal
             continue
-        new_formula.append(clause)
+        values[var] = any(not any(values[abs(l)] == (l > 0) for l in clause if l != var) for clause in pos)
+    return [i if values[i] else -i for i in range(1, num_vars + 1)]
 
-    for c1 in pos_clauses:
-        for c2 in neg_clauses:
-            res = resolve(c1, c2, literal)
-            if res is not None:
-                if len(res) == 0:
-                    return None  # Empty clause → contradiction
-                new_formula.append(res)
+def dp_solver(formula, num_vars=None, max_clauses=DEFAULT_MAX_CLAUSES, max_memory=DEFAULT_MAX_MEMORY,
+              time_limit=None, stats=None, progress=None, progress_interval=1.0, profile=None):
+    # Davis-Putnam by variable elimination. Returns (status, model): SAT with a
+    # model, UNSAT, or ABORTED once the clause count or memory cap is hit, or
+    # time_limit seconds have passed (checked between eliminations).
+    # Counters and time per phase are added to stats if one is given; progress
+    # and profile work as for the other solvers.
+    if stats is None:
+        stats = SolverStats()
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    with profiling(profile, stats):
+        result = dp_search(formula, num_vars, max_clauses, max_memory, deadline, stats,
+                           make_progress(progress, stats, progress_interval))
+    stats.solve_time = time.perf_counter() - start
+    return result
 
-    return new_formula
+def dp_search(formula, num_vars, max_clauses, max_memory, deadline, stats, progress):
+    if num_vars is None:
+        num_vars = max((abs(l) for clause in formula for l in clause), default=0)
+    index = ClauseIndex(num_vars)
+    for clause in sorted(map(frozenset, formula), key=len):
+        if all(-l not in clause for l in clause):
+            index.insert(clause)
+    eliminated = []
+    heap = []
 
-def dp_solver(formula):
     while True:
-        if not formula:
-            return True  # SAT
+        if progress is not None:
+            progress.tick()
+        if index.empty:
+            stats.conflicts += 1
+            return UNSAT, None
+        if not index.clauses:
+            return SAT, extend_model(num_vars, eliminated)
+        if len(index.clauses) > max_clauses or index.memory > max_memory:
+            return ABORTED, None
+        if deadline is not None and time.perf_counter() > deadline:
+            return ABORTED, None
 
-        pure_literals = find_pure_literals(formula)
-        if pure_literals:
-            formula = [clause for clause in formula if all(l not in clause for l in pure_literals)]
+        if index.units:
+            unit = index.units.pop()
+            if unit in index.clauses:
+                (literal,) = unit
+                start = time.perf_counter()
+                assign(index, literal, eliminated)
+                stats.propagations += 1
+                stats.add_time("propagate", time.perf_counter() - start)
             continue
 
-        literals = set(l for clause in formula for l in clause)
-        if not literals:
-            return False  # UNSAT
-        chosen_literal = next(iter(literals))
-
-        new_formula = apply_resolution(formula, chosen_literal)
-        if new_formula is None:
-            return False
-        formula = new_formula
+        # Eliminate the variable that adds the fewest clauses by the estimate
+        # |pos| * |neg| - |pos| - |neg|, then the one with the fewest occurrences.
+        # Pure literals score below any other variable and go first, without
+        # producing resolvents.
+        for var in index.changed:
+            pos, neg = len(index.occurrences(var)), len(index.occurrences(-var))
+            if pos + neg:
+                heapq.heappush(heap, (pos * neg - pos - neg, pos + neg, var))
+        index.changed = set()
+        while True:
+            growth, count, var = heapq.heappop(heap)
+            pos, neg = len(index.occurrences(var)), len(index.occurrences(-var))
+            if pos + neg == count and count and growth == pos * neg - pos - neg:
+                break  # Otherwise a stale entry; the current score was pushed too
+        if not eliminate(index, var, eliminated, max_clauses, deadline, stats):
+            return ABORTED, None
 
 def read_formula(filepath):
-    formula = []
-    with open(filepath, 'r') as file:
-        for line in file:
-            line = line.strip()
-            if not line or line.startswith('c') or line.startswith('p'):
-                continue
-            clause = list(map(int, line.split()))
-            formula.append(clause)
-    return formula
+    return [[decode(lit) for lit in clause] for clause in dimacs.load(filepath).clauses()]
 
 
 def run_all_formulas(folder="."):
@@ -77,15 +235,57 @@ def run_all_formulas(folder="."):
         if not filename.endswith(".cnf") and not filename.endswith(".cnf.txt"):
             continue
         path = os.path.join(folder, filename)
-        formula = read_formula(path)
+        cnf = dimacs.load(path)
+        formula = [[decode(lit) for lit in clause] for clause in cnf.clauses()]
 
         print(f"Solving {filename}...")
         start_time = time.time()
-        result = dp_solver(formula)
+        stats = SolverStats()
+        result, model = dp_solver(formula, cnf.num_vars, time_limit=CLI_TIME_LIMIT, stats=stats)
         elapsed = time.time() - start_time
-        print(f"  Result: {'SAT' if result else 'UNSAT'}")
+        print(f"  Result: {result}")
+        print(f"  {stats.summary()}")
         print(f"  Time: {elapsed:.6f} seconds\n")
 
+def regression_instances():
+    # (name, num_vars, clauses) of the regression set
+    from generators import random_ksat, php
+    for seed in range(10):
+        num_vars, _, chunks = random_ksat(30, 3, 4.0, seed)
+        clauses = [row.tolist() for chunk in chunks for row in chunk]
+        yield f"random 3-SAT, 30 variables, 120 clauses, seed {seed}", num_vars, clauses
+    for n in (4, 5):
+        num_vars, clauses = php(n)
+        yield f"pigeonhole, {n + 1} pigeons in {n} holes", num_vars, clauses
+
+def regression(time_limit=REGRESSION_SECONDS):
+    # Every regression instance answered within time_limit, SAT with a model that
+    # satisfies the clauses and UNSAT only where CDCL agrees. Returns the failures.
+    from CDCL import SATSolverCDCL
+    from cnf import CNF, encode
+    failures = []
+    for name, num_vars, clauses in regression_instances():
+        start_time = time.time()
+        result, model = dp_solver(clauses, num_vars, time_limit=time_limit)
+        elapsed = time.time() - start_time
+        cnf = CNF(num_vars)
+        for clause in clauses:
+            cnf.add_clause([encode(l) for l in clause])
+        solver = SATSolverCDCL(verbose=False)
+        solver.load(cnf)
+        solver.solve()
+        expected = SAT if solver.model is not None else UNSAT
+        if result == SAT:
+            true = set(model)
+            ok = expected == SAT and all(any(l in true for l in clause) for clause in clauses)
+        else:
+            ok = result == expected
+        print(f"{name:<48} {result:<8} {elapsed:7.3f}s  {'ok' if ok else 'FAIL (expected ' + expected + ')'}")
+        if not ok:
+            failures.append(name)
+    return failures
+
 if __name__ == "__main__":
+    if sys.argv[1:] == ["--regression"]:
+        sys.exit(1 if regression() else 0)
     run_all_formulas()
-
@@ -2,6 +2,13 @@ import os
 import time
 import math
 
+from array import array
+
+import dimacs
+from cnf import ClauseArena
+from cardinality import expand_cards
+from stats import SolverStats, make_progress, profiling
+
 # Category constants for SAT solving results
 class Cat:
     SATISFIED = 0      # Formula is satisfied
@@ -16,6 +23,7 @@ class Formula:
         self.literal_frequency = []    # Frequency of each literal in clauses
         self.literal_polarity = []     # Sum of polarities (positive/negative) for each literal
         self.clauses = []              # List of clauses (each clause is a list of literals)
+        self.branch_order = []         # Variables by decreasing frequency, shared by all copies
 
     def copy(self):
         # Deep copy of the formula for recursive DPLL steps
@@ -24,57 +32,222 @@ class Formula:
         new_formula.literal_frequency = self.literal_frequency[:]
         new_formula.literal_polarity = self.literal_polarity[:]
         new_formula.clauses = [clause[:] for clause in self.clauses]
+        new_formula.branch_order = self.branch_order
         return new_formula
 
+# Search state of the non-copying DPLL: one trail plus per-clause counters
+class Trail:
+    def __init__(self, num_vars):
+        self.arena = ClauseArena()             # Normalized clauses (no repeated or complementary literals)
+        self.crefs = array('i')                # Clause number -> clause reference in the arena
+        self.occurs = [array('i') for _ in range(2 * num_vars)]  # Literal -> numbers of clauses containing it
+        self.values = array('b', [-1]) * (2 * num_vars)          # Per encoded literal: 1 true, 0 false, -1 unassigned
+        self.true_count = array('i')           # Per clause: number of true literals
+        self.false_count = array('i')          # Per clause: number of false literals
+        self.satisfied = 0                     # Number of clauses with a true literal
+        self.assign_stack = array('i')         # Assigned literals in order, undone down to a checkpoint
+        self.units = []                        # Implied literals waiting to be assigned
+        self.conflict = False
+
 # Class implementing DPLL-based SAT solver
 class SATSolverDPLL:
-    def __init__(self):
+    def __init__(self, verbose=True, mode="trail", progress=None, progress_interval=1.0, profile=None):
+        if mode not in ("trail", "copy"):
+            raise ValueError(f"Unknown DPLL mode '{mode}'. Choose 'trail' or 'copy'.")
         self.formula = Formula()
+        self.trail = None              # Search state of the non-copying mode
+        self.mode = mode               # "trail": undo on one trail, "copy": copy the formula per branch
         self.literal_count = 0         # Total number of literals (variables)
         self.clause_count = 0          # Total number of clauses
+        self.verbose = verbose         # Print the result from show_result
+        self.result = None             # Cat.SATISFIED or Cat.UNSATISFIED once solved
+        self.model = None              # Satisfying assignment as signed literals
+        self.stats = SolverStats()
+        self.progress = progress       # Callback taking the stats (True: print to stderr), every progress_interval seconds
+        self.progress_interval = progress_interval
+        self.profile = profile         # None, "cprofile" or "sampling"; the report goes to stats.profile
 
     def initialize(self, lines):
         # Initialize formula from the lines of the input CNF file
-        header_read = False
-        clause = []
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('c'):
-                continue  # Skip empty/comment lines
-            if line.startswith('p'):
-                # Read problem line (e.g., p cnf 3 2)
-                parts = line.split()
-                self.literal_count = int(parts[2])
-                self.clause_count = int(parts[3])
-                self.formula = Formula()
-                self.formula.literals = [-1] * self.literal_count
-                self.formula.literal_frequency = [0] * self.literal_count
-                self.formula.literal_polarity = [0] * self.literal_count
-                header_read = True
+        self.load(dimacs.parse_lines(lines))
+
+    def load(self, cnf):
+        # Build the working formula from a compact CNF; cardinality constraints
+        # become clauses over auxiliary variables
+        cnf = expand_cards(cnf)
+        self.literal_count = cnf.num_vars
+        self.clause_count = cnf.declared_clauses
+        self.formula = Formula()
+        self.formula.literals = [-1] * self.literal_count
+        self.formula.literal_frequency = [0] * self.literal_count
+        self.formula.literal_polarity = [0] * self.literal_count
+
+        if self.mode == "trail":
+            self.trail = Trail(self.literal_count)
+
+        for lits in cnf.clauses():
+            clause = lits.tolist()
+            for lit in clause:
+                index = lit // 2
+                self.formula.literal_frequency[index] += 1
+                self.formula.literal_polarity[index] += (-1 if lit % 2 else 1)
+            if self.trail is not None:
+                self.add_trail_clause(clause)
+            else:
+                self.formula.clauses.append(clause)
+
+        # Frequencies only change when a variable is assigned (set to -1), so the
+        # most frequent unassigned variable is the first unassigned one in this order
+        frequency = self.formula.literal_frequency
+        self.formula.branch_order = sorted(range(self.literal_count), key=lambda x: -frequency[x])
+
+    def add_trail_clause(self, clause):
+        # Store a clause for the non-copying mode; units are queued, empty clauses conflict
+        t = self.trail
+        lits = []
+        for lit in clause:
+            if lit ^ 1 in lits:
+                return  # Tautology
+            if lit not in lits:
+                lits.append(lit)
+        if not lits:
+            t.conflict = True
+            return
+        if len(lits) == 1:
+            t.units.append(lits[0])
+            return
+        number = len(t.crefs)
+        t.crefs.append(t.arena.add(lits))
+        t.true_count.append(0)
+        t.false_count.append(0)
+        for lit in lits:
+            t.occurs[lit].append(number)
+
+    def assign(self, lit):
+        # Make lit true and update the clause counters; a clause with no true literal
+        # and one unassigned literal left queues that literal, one with none left conflicts
+        t = self.trail
+        data = t.arena.data
+        crefs = t.crefs
+        values = t.values
+        true_count = t.true_count
+        false_count = t.false_count
+        values[lit] = 1
+        values[lit ^ 1] = 0
+        t.assign_stack.append(lit)
+        for c in t.occurs[lit]:
+            if true_count[c] == 0:
+                t.satisfied += 1
+            true_count[c] += 1
+        for c in t.occurs[lit ^ 1]:
+            false_count[c] += 1
+            if true_count[c] == 0:
+                cref = crefs[c]
+                free = data[cref - 3] - false_count[c]
+                if free == 0:
+                    t.conflict = True
+                elif free == 1:
+                    for k in range(cref, cref + data[cref - 3]):
+                        if values[data[k]] == -1:
+                            t.units.append(data[k])
+                            break
+
+    def trail_propagate(self):
+        # Assign queued unit literals until the queue is empty or a clause is falsified
+        t = self.trail
+        values = t.values
+        units = t.units
+        assigned = len(t.assign_stack)
+        while units and not t.conflict:
+            lit = units.pop()
+            if values[lit] == 1:
                 continue
+            if values[lit] == 0:
+                t.conflict = True
+                break
+            self.assign(lit)
+        self.stats.propagations += len(t.assign_stack) - assigned
+        if t.conflict:
+            units.clear()
+            self.stats.conflicts += 1
+            return False
+        return True
 
-            if not header_read:
-                raise ValueError("CNF header line (starting with 'p') missing.")
+    def undo(self, checkpoint):
+        # Unassign everything after the checkpoint, reversing the counter updates
+        t = self.trail
+        values = t.values
+        true_count = t.true_count
+        false_count = t.false_count
+        occurs = t.occurs
+        trail = t.assign_stack
+        for i in range(len(trail) - 1, checkpoint - 1, -1):
+            lit = trail[i]
+            values[lit] = -1
+            values[lit ^ 1] = -1
+            for c in occurs[lit]:
+                true_count[c] -= 1
+                if true_count[c] == 0:
+                    t.satisfied -= 1
+            for c in occurs[lit ^ 1]:
+                false_count[c] -= 1
+        del trail[checkpoint:]
+        t.conflict = False
 
-            # Parse clause literals
-            for lit_str in line.split():
-                literal = int(lit_str)
-                if literal == 0:
-                    # End of a clause
-                    self.formula.clauses.append(clause)
-                    clause = []
-                else:
-                    index = abs(literal) - 1
-                    if index >= self.literal_count:
-                        raise IndexError(f"Literal {literal} exceeds declared variable count {self.literal_count}.")
-                    encoded = 2 * index + (1 if literal < 0 else 0)  # Encode literal
-                    clause.append(encoded)
-                    self.formula.literal_frequency[index] += 1
-                    self.formula.literal_polarity[index] += (1 if literal > 0 else -1)
+    def trail_DPLL(self, progress=None):
+        # Non-copying DPLL: the recursion of DPLL() as an explicit stack of
+        # (decision literal, trail checkpoint, branch order position, second branch)
+        t = self.trail
+        f = self.formula
+        stats = self.stats
+        if t.conflict or not self.trail_propagate():
+            return Cat.NORMAL
+        order = f.branch_order
+        polarity = f.literal_polarity
+        values = t.values
+        stack = []
+        position = 0
+        # Time per phase is summed in locals and added to the stats on the way out
+        clock = time.perf_counter
+        propagate_time = backtrack_time = 0.0
+        try:
+            while True:
+                if progress is not None:
+                    progress.tick()
+                if t.satisfied == len(t.crefs):
+                    for lit in t.assign_stack:
+                        f.literals[lit >> 1] = lit & 1
+                    self.show_result(f, Cat.SATISFIED)
+                    return Cat.COMPLETED
 
-        if clause:  # Append any unfinished clause
-            self.formula.clauses.append(clause)
+                # Choose the most frequent unassigned variable; every variable before
+                # position is assigned on the current branch
+                while values[2 * order[position]] != -1:
+                    position += 1
+                var = order[position]
+                lit = 2 * var if polarity[var] > 0 else 2 * var + 1
+                stats.decisions += 1
+                stack.append((lit, len(t.assign_stack), position, False))
+                t.units.append(lit)
+                while True:
+                    start = clock()
+                    ok = self.trail_propagate()
+                    now = clock()
+                    propagate_time += now - start
+                    if ok:
+                        break
+                    while stack and stack[-1][3]:
+                        stack.pop()
+                    if not stack:
+                        return Cat.NORMAL
+                    lit, checkpoint, position, _ = stack.pop()
+                    self.undo(checkpoint)
+                    stack.append((lit ^ 1, checkpoint, position, True))
+                    t.units.append(lit ^ 1)
+                    backtrack_time += clock() - now
+        finally:
+            stats.add_time("propagate", propagate_time)
+            stats.add_time("backtrack", backtrack_time)
 
     def unit_propagate(self, f):
         # Perform unit propagation
@@ -84,9 +257,11 @@ class SATSolverDPLL:
             unit_clause_found = False
             for clause in f.clauses:
                 if len(clause) == 0:
+                    self.stats.conflicts += 1
                     return Cat.UNSATISFIED  # Empty clause means conflict
                 if len(clause) == 1:
                     unit_clause_found = True
+                    self.stats.propagations += 1
                     lit = clause[0]
                     var = lit // 2
                     val = lit % 2
@@ -137,8 +312,9 @@ class SATSolverDPLL:
             return Cat.NORMAL
 
         # Choose the most frequent unassigned variable
-        i = max(range(len(f.literal_frequency)), key=lambda x: f.literal_frequency[x])
+        i = next((x for x in f.branch_order if f.literal_frequency[x] != -1), 0)
         for j in range(2):
+            self.stats.decisions += 1
             new_f = f.copy()
             if new_f.literal_polarity[i] > 0:
                 new_f.literals[i] = j
@@ -150,6 +326,7 @@ class SATSolverDPLL:
                 self.show_result(new_f, result)
                 return Cat.COMPLETED
             elif result == Cat.UNSATISFIED:
+                self.stats.conflicts += 1
                 continue
             dpll_result = self.DPLL(new_f)
             if dpll_result == Cat.COMPLETED:
@@ -157,22 +334,32 @@ class SATSolverDPLL:
         return Cat.NORMAL
 
     def show_result(self, f, result):
-        # Output the SAT or UNSAT result
+        # Record the SAT or UNSAT result and output it if verbose
+        self.result = result
         if result == Cat.SATISFIED:
-            print("SAT")
-            output = []
+            self.model = []
             for i, val in enumerate(f.literals):
                 if val == -1:
-                    output.append(str(i + 1))
+                    self.model.append(i + 1)
                 else:
-                    output.append(str((-1) ** val * (i + 1)))
-            print(" ".join(output) + " 0")
+                    self.model.append((-1) ** val * (i + 1))
+            if self.verbose:
+                print("SAT")
+                print(" ".join(map(str, self.model)) + " 0")
         else:
-            print("UNSAT")
+            self.model = None
+            if self.verbose:
+                print("UNSAT")
 
     def solve(self):
         # Start solving process using DPLL
-        result = self.DPLL(self.formula)
+        start = time.perf_counter()
+        with profiling(self.profile, self.stats):
+            if self.mode == "trail":
+                result = self.trail_DPLL(make_progress(self.progress, self.stats, self.progress_interval))
+            else:
+                result = self.DPLL(self.formula)
+        self.stats.solve_time = time.perf_counter() - start
         if result == Cat.NORMAL:
             self.show_result(self.formula, Cat.UNSATISFIED)
 
@@ -190,12 +377,10 @@ def main():
         start_time = time.time()
 
         try:
-            with open(os.path.join(folder, filename), 'r') as file:
-                lines = file.readlines()
-
             solver = SATSolverDPLL()
-            solver.initialize(lines)
+            solver.load(dimacs.load(os.path.join(folder, filename)))
             solver.solve()
+            print(solver.stats.summary())
         except Exception as e:
             print(f"Error processing {filename}: {e}")
 
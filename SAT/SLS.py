@@ -0,0 +1,356 @@
+# Stochastic local search: probSAT and WalkSAT (SKC). Incomplete, it can only
+# answer SAT; when the flip or time budget runs out the result is UNKNOWN and the
+# assignment with the fewest unsatisfied clauses can seed the phases of
+# SATSolverCDCL.
+#
+# Clauses and occurrence lists are flat arrays indexed by offsets. Every clause
+# keeps its number of true literals and the XOR of its true literals, which is
+# the critical literal when exactly one is true; break and make counts per
+# variable are updated on every flip, and the unsatisfied clauses form a list
+# with a position index for O(1) insertion and removal.
+import os
+import sys
+import time
+import random
+
+from array import array
+
+import dimacs
+from cardinality import expand_cards
+from stats import SolverStats, make_progress, profiling
+
+class Cat:
+    SATISFIED = 0
+    UNSATISFIED = 1    # Only for a formula with an empty clause
+    NORMAL = 2
+    COMPLETED = 3
+    UNKNOWN = 4        # Budget exhausted without a model
+
+# probSAT break functions by maximum clause length (Balint and Schoening, 2012):
+# polynomial (eps + break)^-cb for 3-SAT, exponential cb^-break above
+PROBSAT_CB = {3: ("poly", 2.38), 4: ("exp", 3.0), 5: ("exp", 3.7), 6: ("exp", 5.1), 7: ("exp", 5.4)}
+PROBSAT_EPS = 1.0
+CHECK_EVERY = 1024     # Flips between clock reads for the time limit
+DEFAULT_MAX_FLIPS = 1000000   # About ten seconds; without a budget an UNSAT formula never ends
+
+class SATSolverSLS:
+    def __init__(self, algorithm="probsat", max_flips=DEFAULT_MAX_FLIPS, time_limit=None, seed=None, cb=None, noise=0.567,
+                 verbose=True, progress=None, progress_interval=1.0, profile=None):
+        if algorithm not in ("probsat", "walksat"):
+            raise ValueError(f"Unknown local search algorithm '{algorithm}'. Choose 'probsat' or 'walksat'.")
+        self.algorithm = algorithm
+        self.max_flips = max_flips       # None: no flip budget (then set a time_limit)
+        self.time_limit = time_limit     # Seconds, None: no time budget
+        self.rng = random.Random(seed)
+        self.cb = cb                     # probSAT break base; None picks it by clause length
+        self.noise = noise               # WalkSAT random walk probability
+        self.verbose = verbose
+        self.result = None
+        self.model = None
+        self.literal_count = 0
+        self.clause_count = 0
+        self.stats = SolverStats()
+        self.progress = progress         # Callback taking the stats (True: print to stderr), every progress_interval seconds
+        self.progress_interval = progress_interval
+        self.profile = profile           # None, "cprofile" or "sampling"; the report goes to stats.profile
+        self.has_empty = False
+        self.lits = array('i')           # Literals of all clauses, back to back
+        self.starts = array('i', [0])    # Clause c is lits[starts[c]:starts[c + 1]]
+        self.occ = array('i')            # Clauses per literal, back to back
+        self.occ_starts = array('i')     # Literal lit occurs in occ[occ_starts[lit]:occ_starts[lit + 1]]
+        self.assign = bytearray()        # Per variable: sign of its true literal (0: variable true)
+        self.true_count = array('i')
+        self.true_xor = array('i')
+        self.breaks = array('i')         # Per variable: clauses that flipping it would falsify
+        self.makes = array('i')          # Per variable: unsatisfied clauses that flipping it would satisfy
+        self.unsat = array('i')
+        self.where = array('i')          # Position of each unsatisfied clause in unsat
+        self.best = bytearray()          # Assignment with the fewest unsatisfied clauses so far
+        self.best_count = 0
+        self.max_length = 0
+
+    def initialize(self, lines):
+        self.load(dimacs.parse_lines(lines))
+
+    def load(self, cnf):
+        # Copy the clauses without duplicate literals and tautologies; cardinality
+        # constraints become clauses over auxiliary variables
+        cnf = expand_cards(cnf)
+        self.literal_count = n = cnf.num_vars
+        self.clause_count = cnf.declared_clauses
+        self.has_empty = False
+        self.max_length = 0
+        lits = array('i')
+        starts = array('i', [0])
+        counts = [0] * (2 * n)
+        for clause in cnf.clauses():
+            unique = set(clause)
+            if any(lit ^ 1 in unique for lit in unique):
+                continue
+            if not unique:
+                self.has_empty = True
+                continue
+            lits.extend(unique)
+            starts.append(len(lits))
+            for lit in unique:
+                counts[lit] += 1
+            self.max_length = max(self.max_length, len(unique))
+        occ_starts = array('i', [0]) * (2 * n + 1)
+        total = 0
+        for lit in range(2 * n):
+            occ_starts[lit] = total
+            total += counts[lit]
+        occ_starts[2 * n] = total
+        occ = array('i', [0]) * total
+        fill = array('i', occ_starts)
+        for c in range(len(starts) - 1):
+            for k in range(starts[c], starts[c + 1]):
+                lit = lits[k]
+                occ[fill[lit]] = c
+                fill[lit] += 1
+        self.lits, self.starts, self.occ, self.occ_starts = lits, starts, occ, occ_starts
+
+    def reset(self, phases=None):
+        # Start from phases (encoded literals, e.g. a CDCL model) or a random
+        # assignment, and count true literals, breaks and makes from scratch
+        n = self.literal_count
+        rng = self.rng
+        self.assign = bytearray(rng.getrandbits(1) for _ in range(n))
+        for lit in phases or ():
+            self.assign[lit >> 1] = lit & 1
+        assign = self.assign
+        lits, starts = self.lits, self.starts
+        num_clauses = len(starts) - 1
+        self.true_count = true_count = array('i', [0]) * num_clauses
+        self.true_xor = true_xor = array('i', [0]) * num_clauses
+        self.breaks = breaks = array('i', [0]) * n
+        self.makes = makes = array('i', [0]) * n
+        self.unsat = unsat = array('i')
+        self.where = where = array('i', [-1]) * num_clauses
+        for c in range(num_clauses):
+            count = x = 0
+            for k in range(starts[c], starts[c + 1]):
+                lit = lits[k]
+                if assign[lit >> 1] == lit & 1:
+                    count += 1
+                    x ^= lit
+            true_count[c] = count
+            true_xor[c] = x
+            if count == 1:
+                breaks[x >> 1] += 1
+            elif count == 0:
+                where[c] = len(unsat)
+                unsat.append(c)
+                for k in range(starts[c], starts[c + 1]):
+                    makes[lits[k] >> 1] += 1
+        self.best = bytearray(assign)
+        self.best_count = len(unsat)
+
+    def flip(self, var):
+        assign = self.assign
+        lits, starts, occ, occ_starts = self.lits, self.starts, self.occ, self.occ_starts
+        true_count, true_xor, breaks, makes = self.true_count, self.true_xor, self.breaks, self.makes
+        unsat, where = self.unsat, self.where
+        t = 2 * var | (assign[var] ^ 1)    # The literal becoming true
+        f = t ^ 1
+        assign[var] ^= 1
+        for k in range(occ_starts[t], occ_starts[t + 1]):
+            c = occ[k]
+            count = true_count[c]
+            if count == 0:
+                # Satisfied now, with t critical
+                i = where[c]
+                last = unsat.pop()
+                if last != c:
+                    unsat[i] = last
+                    where[last] = i
+                where[c] = -1
+                for j in range(starts[c], starts[c + 1]):
+                    makes[lits[j] >> 1] -= 1
+                breaks[var] += 1
+            elif count == 1:
+                breaks[true_xor[c] >> 1] -= 1
+            true_count[c] = count + 1
+            true_xor[c] ^= t
+        for k in range(occ_starts[f], occ_starts[f + 1]):
+            c = occ[k]
+            count = true_count[c] - 1
+            true_count[c] = count
+            x = true_xor[c] ^ f
+            true_xor[c] = x
+            if count == 0:
+                # f was the critical literal
+                breaks[var] -= 1
+                where[c] = len(unsat)
+                unsat.append(c)
+                for j in range(starts[c], starts[c + 1]):
+                    makes[lits[j] >> 1] += 1
+            elif count == 1:
+                breaks[x >> 1] += 1
+
+    def break_weights(self):
+        # probSAT probability weight per break value
+        kind, cb = PROBSAT_CB[min(max(self.max_length, 3), 7)]
+        if self.cb is not None:
+            cb = self.cb
+        top = max((self.occ_starts[lit + 1] - self.occ_starts[lit] for lit in range(2 * self.literal_count)), default=0)
+        if kind == "poly":
+            return [(PROBSAT_EPS + b) ** -cb for b in range(top + 1)]
+        return [cb ** -b for b in range(top + 1)]
+
+    def search(self, progress=None):
+        unsat = self.unsat
+        lits, starts, breaks = self.lits, self.starts, self.breaks
+        rng = self.rng
+        randrange = rng.randrange
+        rand = rng.random
+        probsat = self.algorithm == "probsat"
+        weights = self.break_weights() if probsat else None
+        noise = self.noise
+        stats = self.stats
+        max_flips = self.max_flips
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        # Variables flipped since best was last brought up to date; replaying them
+        # costs O(1) per flip instead of copying the assignment at every new best
+        since_best = []
+        n = self.literal_count
+        flips = 0
+        while unsat:
+            if max_flips is not None and flips >= max_flips:
+                break
+            if flips % CHECK_EVERY == 0 and deadline is not None and time.perf_counter() >= deadline:
+                break
+            if progress is not None:
+                progress.tick()
+            c = unsat[randrange(len(unsat))]
+            clause = lits[starts[c]:starts[c + 1]]
+            if probsat:
+                probs = [weights[breaks[lit >> 1]] for lit in clause]
+                r = rand() * sum(probs)
+                for lit, p in zip(clause, probs):
+                    r -= p
+                    if r <= 0:
+                        break
+            else:
+                # WalkSAT: a free move if there is one, else a random walk step
+                # with probability noise, else a variable with the fewest breaks
+                scores = [breaks[lit >> 1] for lit in clause]
+                least = min(scores)
+                if least > 0 and rand() < noise:
+                    lit = clause[randrange(len(clause))]
+                else:
+                    candidates = [lit for lit, b in zip(clause, scores) if b == least]
+                    lit = candidates[randrange(len(candidates))]
+            var = lit >> 1
+            self.flip(var)
+            flips += 1
+            if len(since_best) <= n:
+                since_best.append(var)
+            if len(unsat) < self.best_count:
+                best, assign = self.best, self.assign
+                if len(since_best) > n:
+                    best[:] = assign
+                else:
+                    for v in since_best:
+                        best[v] = assign[v]
+                since_best = []
+                self.best_count = len(unsat)
+        stats.flips += flips
+        if not unsat:
+            self.show_result(Cat.SATISFIED)
+            return Cat.COMPLETED
+        return Cat.NORMAL
+
+    def phases(self):
+        # Best assignment found so far, as encoded literals
+        return [2 * var | sign for var, sign in enumerate(self.best)]
+
+    def show_result(self, result):
+        self.result = result
+        if result == Cat.SATISFIED:
+            self.model = [-(var + 1) if sign else var + 1 for var, sign in enumerate(self.assign)]
+            if self.verbose:
+                print("SAT")
+                print(" ".join(map(str, self.model)) + " 0")
+        else:
+            self.model = None
+            if self.verbose:
+                print("UNSAT" if result == Cat.UNSATISFIED else "UNKNOWN")
+
+    def solve(self, phases=None):
+        # Search from phases (encoded literals) or a random assignment until a
+        # model is found or the budget is spent
+        start = time.perf_counter()
+        if self.has_empty:
+            self.show_result(Cat.UNSATISFIED)
+            return self.result
+        self.reset(phases)
+        with profiling(self.profile, self.stats):
+            result = self.search(make_progress(self.progress, self.stats, self.progress_interval))
+        self.stats.solve_time = time.perf_counter() - start
+        if result == Cat.NORMAL:
+            self.show_result(Cat.UNKNOWN)
+        return self.result
+
+def solve_hybrid(cnf, max_flips=100000, seed=None, **options):
+    # Local search first; if it runs out of flips, CDCL starts from its best
+    # assignment. Returns the CDCL or SLS solver that produced the answer.
+    from CDCL import SATSolverCDCL
+    sls = SATSolverSLS(max_flips=max_flips, seed=seed, verbose=False)
+    sls.load(cnf)
+    if sls.solve() == Cat.SATISFIED:
+        return sls
+    solver = SATSolverCDCL(verbose=False, seed=seed, **options)
+    solver.load(cnf)
+    if sls.result == Cat.UNKNOWN:
+        solver.set_phases(sls.phases())
+    solver.solve()
+    return solver
+
+def compare(name, cnf, max_flips, cdcl=True):
+    from CDCL import SATSolverCDCL
+    print(f"\nProcessing {name}...")
+    if cdcl:
+        start_time = time.time()
+        solver = SATSolverCDCL(verbose=False)
+        solver.load(cnf)
+        solver.solve()
+        print(f"CDCL: {'SAT' if solver.model is not None else 'UNSAT'} in {time.time() - start_time:.4f} seconds")
+    for algorithm in ("probsat", "walksat"):
+        start_time = time.time()
+        sls = SATSolverSLS(algorithm, max_flips=max_flips, seed=1, verbose=False)
+        sls.load(cnf)
+        result = sls.solve()
+        elapsed = time.time() - start_time
+        search = sls.stats.solve_time
+        status = "SAT" if result == Cat.SATISFIED else f"UNKNOWN ({sls.best_count} clauses left unsatisfied)"
+        print(f"{algorithm}: {status} in {elapsed:.4f} seconds, {sls.stats.flips} flips "
+              f"({sls.stats.flips / max(search, 1e-9):,.0f} flips/s)")
+    if cdcl:
+        start_time = time.time()
+        hybrid = solve_hybrid(cnf, max_flips=min(max_flips, 20000), seed=1)
+        print(f"probSAT then CDCL from its phases: {'SAT' if hybrid.model is not None else 'UNSAT'} "
+              f"in {time.time() - start_time:.4f} seconds")
+
+def random_instance(num_vars, ratio, seed):
+    from generators import random_ksat, format_clauses
+    num_vars, num_clauses, chunks = random_ksat(num_vars, 3, ratio, seed)
+    return dimacs.parse_lines([f"p cnf {num_vars} {num_clauses}\n"] + [format_clauses(chunk) for chunk in chunks])
+
+def main():
+    # python SLS.py [max flips]: CDCL against local search on every .cnf/.cnf.txt
+    # file in the current folder and on random 3-SAT below the threshold, then
+    # local search alone on random 3-SAT too large for CDCL
+    folder = os.getcwd()
+    files = [f for f in os.listdir(folder) if f.endswith('.cnf') or f.endswith('.cnf.txt')]
+    max_flips = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for filename in files:
+        compare(filename, dimacs.load(os.path.join(folder, filename)), max_flips)
+    for num_vars in (150, 200, 250):
+        compare(f"random 3-SAT, {num_vars} variables, ratio 4.1", random_instance(num_vars, 4.1, num_vars), max_flips)
+    for num_vars in (5000, 20000):
+        compare(f"random 3-SAT, {num_vars} variables, ratio 4.0", random_instance(num_vars, 4.0, num_vars),
+                max(max_flips, 2000000), cdcl=False)
+
+if __name__ == "__main__":
+    main()
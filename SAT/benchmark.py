@@ -0,0 +1,256 @@
+# Batch benchmark harness: runs one solver over a directory or manifest of CNF
+# files in parallel worker processes, with a hard wall-clock and memory limit per
+# instance. Results (wall and CPU time, peak RSS, status, solver statistics) go to
+# JSON and CSV, together with the PAR-2 score and cactus plot data, and a run can
+# be compared against a stored baseline to flag regressions.
+#
+#   python benchmark.py ../benchmarks --solver cdcl --jobs 4 --timeout 60 --json run.json
+#   python benchmark.py ../benchmarks --solver cdcl --set restart=luby --baseline run.json
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: no memory limit or RSS figures
+    resource = None
+
+import dimacs
+from cnf import decode
+from cardinality import expand_cards
+from CDCL import SATSolverCDCL
+from DPLL import SATSolverDPLL
+from SLS import SATSolverSLS, Cat as SLSCat
+from DP import dp_solver, SAT, UNSAT
+from stats import SolverStats
+from certify import check_model
+
+TIMEOUT = "TIMEOUT"
+MEMOUT = "MEMOUT"
+ERROR = "ERROR"
+WRONG = "WRONG"      # Reported SAT with a model that falsifies a clause
+UNKNOWN = "UNKNOWN"  # Incomplete solver (sls) out of budget
+
+def find_instances(source):
+    # A directory (every .cnf/.cnf.txt file in it, plus compressed variants) or
+    # a manifest file listing one path per line, relative to the manifest
+    if os.path.isdir(source):
+        names = sorted(f for f in os.listdir(source)
+                       if any(f.endswith(ext + comp) for ext in ('.cnf', '.cnf.txt') for comp in ('', '.gz', '.bz2', '.xz')))
+        return [os.path.join(source, name) for name in names]
+    folder = os.path.dirname(os.path.abspath(source))
+    with open(source) as manifest:
+        lines = [line.strip() for line in manifest]
+    return [os.path.join(folder, line) for line in lines if line and not line.startswith('#')]
+
+def run_solver(solver, options, cnf):
+    # Returns (status, model, statistics as a flat dict)
+    if solver == "dp":
+        cnf = expand_cards(cnf)
+        formula = [[decode(lit) for lit in clause] for clause in cnf.clauses()]
+        stats = SolverStats()
+        status, model = dp_solver(formula, cnf.num_vars, stats=stats, **options)
+        return status, model, stats.as_dict()
+    if solver == "cdcl":
+        engine = SATSolverCDCL(verbose=False, **options)
+    elif solver == "dpll":
+        engine = SATSolverDPLL(verbose=False, **options)
+    elif solver == "sls":
+        engine = SATSolverSLS(verbose=False, **options)
+        engine.load(cnf)
+        result = engine.solve()
+        status = SAT if result == SLSCat.SATISFIED else UNSAT if result == SLSCat.UNSATISFIED else UNKNOWN
+        return status, engine.model, engine.stats.as_dict()
+    else:
+        raise ValueError(f"Unknown solver '{solver}'. Choose 'cdcl', 'dpll', 'dp' or 'sls'.")
+    engine.load(cnf)
+    engine.solve()
+    return (SAT if engine.model is not None else UNSAT), engine.model, engine.stats.as_dict()
+
+def worker(path, solver, options, memory_limit, conn):
+    # Child process: one instance, reported through conn
+    if resource is not None and memory_limit:
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    record = {"status": ERROR, "stats": {}}
+    try:
+        cnf = dimacs.load(path)
+        status, model, stats = run_solver(solver, options, cnf)
+        if status == SAT and not check_model(cnf, model):
+            status = WRONG
+        record.update(status=status, stats=stats)
+    except MemoryError:
+        record["status"] = MEMOUT
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["cpu"] = time.process_time()
+    if resource is not None:
+        record["rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send(record)
+    conn.close()
+
+def run_benchmark(paths, solver="cdcl", options=None, jobs=1, timeout=60.0, memory_limit=2048, progress=None):
+    # Solve every path with at most jobs processes; a process still running after
+    # timeout seconds is killed and recorded as TIMEOUT. Returns one dict per path,
+    # in the order of paths.
+    options = options or {}
+    if solver == "sls" and options.get("time_limit") is None:
+        # Local search cannot prove UNSAT: stop it before the kill so it reports UNKNOWN
+        options = dict(options, time_limit=0.8 * timeout)
+    pending = list(enumerate(paths))
+    running = {}   # sentinel -> (index, path, process, connection, start)
+    results = [None] * len(paths)
+    while pending or running:
+        while pending and len(running) < jobs:
+            index, path = pending.pop(0)
+            receiver, sender = mp.Pipe(duplex=False)
+            process = mp.Process(target=worker, args=(path, solver, options, memory_limit, sender), daemon=True)
+            process.start()
+            sender.close()
+            running[process.sentinel] = (index, path, process, receiver, time.time())
+        now = time.time()
+        deadline = min(start + timeout for _, _, _, _, start in running.values())
+        ready = wait(list(running), timeout=max(deadline - now, 0))
+        now = time.time()
+        for sentinel in list(running):
+            index, path, process, receiver, start = running[sentinel]
+            if sentinel in ready:
+                record = receiver.recv() if receiver.poll() else {"status": MEMOUT if process.exitcode else ERROR, "stats": {}}
+                process.join()
+                wall = now - start
+            elif now - start >= timeout:
+                process.kill()
+                process.join()
+                record = {"status": TIMEOUT, "stats": {}}
+                wall = timeout
+            else:
+                continue
+            receiver.close()
+            del running[sentinel]
+            record.update(instance=os.path.basename(path), path=path, solver=solver, wall=wall)
+            record.setdefault("cpu", None)
+            record.setdefault("rss_kb", None)
+            results[index] = record
+            if progress is not None:
+                progress(record)
+    return results
+
+def solved(record):
+    return record["status"] in (SAT, UNSAT)
+
+def par2(results, timeout):
+    # Penalized average runtime: unsolved instances count twice the timeout
+    if not results:
+        return 0.0
+    return sum(r["wall"] if solved(r) else 2 * timeout for r in results) / len(results)
+
+def cactus(results):
+    # (instances solved, time of the slowest of them) pairs for a cactus plot
+    times = sorted(r["wall"] for r in results if solved(r))
+    return [(count, t) for count, t in enumerate(times, 1)]
+
+def summarize(results, timeout):
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {"instances": len(results), "solved": sum(1 for r in results if solved(r)), "statuses": counts,
+            "par2": par2(results, timeout), "cactus": cactus(results)}
+
+def compare(results, baseline, tolerance=0.2, noise=0.1):
+    # Regressions against baseline results: answers that changed or got lost, and
+    # instances more than tolerance slower (ignoring differences below noise seconds)
+    old = {r["instance"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        before = old.get(r["instance"])
+        if before is None:
+            continue
+        if solved(before) and solved(r) and before["status"] != r["status"]:
+            regressions.append((r["instance"], f"answer changed from {before['status']} to {r['status']}"))
+        elif solved(before) and not solved(r):
+            regressions.append((r["instance"], f"{before['status']} before, now {r['status']}"))
+        elif solved(before) and r["wall"] > before["wall"] * (1 + tolerance) and r["wall"] - before["wall"] > noise:
+            regressions.append((r["instance"], f"{before['wall']:.3f}s -> {r['wall']:.3f}s"))
+    return regressions
+
+def write_json(path, run):
+    with open(path, 'w') as file:
+        json.dump(run, file, indent=2)
+
+def write_csv(path, results):
+    stat_names = sorted({name for r in results for name in r["stats"]})
+    columns = ["instance", "solver", "status", "wall", "cpu", "rss_kb"]
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns + stat_names)
+        for r in results:
+            writer.writerow([r[c] for c in columns] + [r["stats"].get(name, "") for name in stat_names])
+
+def write_cactus(path, points):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["solved", "time"])
+        writer.writerows(points)
+
+def parse_option(text):
+    # key=value, with numbers converted
+    key, _, value = text.partition('=')
+    for convert in (int, float):
+        try:
+            return key, convert(value)
+        except ValueError:
+            pass
+    return key, value
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a solver over a set of CNF files.")
+    parser.add_argument("source", nargs="?", default=".", help="directory of CNF files or a manifest listing them")
+    parser.add_argument("--solver", default="cdcl", choices=["cdcl", "dpll", "dp", "sls"])
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="solver constructor option")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=60.0, help="wall-clock seconds per instance")
+    parser.add_argument("--memory", type=int, default=2048, help="address space limit per instance in MiB (0: none)")
+    parser.add_argument("--json", help="write the full run to this file")
+    parser.add_argument("--csv", help="write one row per instance to this file")
+    parser.add_argument("--cactus", help="write cactus plot points to this file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    options = dict(parse_option(text) for text in args.set)
+    paths = find_instances(args.source)
+    if not paths:
+        print("No .cnf or .cnf.txt files found.")
+        return
+
+    def progress(record):
+        print(f"{record['instance']:<28} {record['status']:<8} {record['wall']:.4f}s")
+
+    results = run_benchmark(paths, args.solver, options, args.jobs, args.timeout, args.memory, progress)
+    summary = summarize(results, args.timeout)
+    print(f"\nSolved {summary['solved']}/{summary['instances']}, PAR-2: {summary['par2']:.4f}")
+
+    run = {"solver": args.solver, "options": options, "timeout": args.timeout, "memory": args.memory,
+           "summary": summary, "results": results}
+    if args.json:
+        write_json(args.json, run)
+    if args.csv:
+        write_csv(args.csv, results)
+    if args.cactus:
+        write_cactus(args.cactus, summary["cactus"])
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)["results"], args.tolerance)
+        for instance, message in regressions:
+            print(f"REGRESSION {instance}: {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Cardinality constraints: at most bound of a list of literals true (a literal
+# listed twice counts twice). CDCL propagates them natively with one counter per
+# constraint; the other engines get them as clauses from expand_cards. find_amo
+# recovers at-most-one constraints from their pairwise encoding in plain CNF.
+#
+# Extended DIMACS (header "p cnf+ <vars> <clauses>") has one constraint per line:
+#   1 2 3 4 <= 1
+#   -5 6 7 >= 2
+#
+#   python cardinality.py   native constraints against clauses on PHP and coloring
+import time
+from array import array
+from itertools import combinations
+
+from cnf import CNF, encode
+
+def expand_cards(cnf, auxiliary=True):
+    # The same formula with every cardinality constraint as clauses: a sequential
+    # counter (Sinz 2005) over fresh variables after cnf.num_vars, or with
+    # auxiliary=False the binomial encoding (no bound + 1 of the literals all
+    # true), which keeps the models as they are but grows as n choose bound + 1.
+    # A CNF without constraints is returned as it is.
+    if not cnf.cards:
+        return cnf
+    expanded = CNF(cnf.num_vars, cnf.declared_clauses)
+    expanded.arena.data = array('i', cnf.arena.data)
+    expanded.arena.clause_count = cnf.arena.clause_count
+    for lits, bound in cnf.cards:
+        n = len(lits)
+        if bound >= n:
+            continue
+        if bound < 0:
+            expanded.add_clause([])
+        elif bound == 0:
+            for lit in lits:
+                expanded.add_clause([lit ^ 1])
+        elif not auxiliary:
+            for subset in combinations(lits, bound + 1):
+                expanded.add_clause([lit ^ 1 for lit in subset])
+        else:
+            # s(i, j): at least j of the first i + 1 literals are true
+            base = expanded.num_vars
+            expanded.num_vars += (n - 1) * bound
+
+            def s(i, j):
+                return 2 * (base + i * bound + j - 1)
+
+            expanded.add_clause([lits[0] ^ 1, s(0, 1)])
+            for j in range(2, bound + 1):
+                expanded.add_clause([s(0, j) ^ 1])
+            for i in range(1, n - 1):
+                x = lits[i] ^ 1
+                expanded.add_clause([x, s(i, 1)])
+                expanded.add_clause([s(i - 1, 1) ^ 1, s(i, 1)])
+                for j in range(2, bound + 1):
+                    expanded.add_clause([x, s(i - 1, j - 1) ^ 1, s(i, j)])
+                    expanded.add_clause([s(i - 1, j) ^ 1, s(i, j)])
+                expanded.add_clause([x, s(i - 1, bound) ^ 1])
+            expanded.add_clause([lits[n - 1] ^ 1, s(n - 2, bound) ^ 1])
+    return expanded
+
+def find_amo(cnf, min_size=3):
+    # Replace pairwise at-most-one encodings by native constraints. A binary
+    # clause (a, b) forbids a ^ 1 and b ^ 1 together. Cliques of that conflict
+    # graph are grown greedily from its highest degree literals, over conflicts
+    # not covered by an earlier clique and taking the neighbours that share the
+    # most of them first. The binary clauses inside a clique of at least min_size
+    # literals are dropped in favour of one constraint. Returns a new CNF (cnf
+    # itself when nothing is found).
+    conflicts = {}
+    for clause in cnf.clauses():
+        if len(clause) == 2 and clause[0] >> 1 != clause[1] >> 1:
+            p, q = clause[0] ^ 1, clause[1] ^ 1
+            conflicts.setdefault(p, set()).add(q)
+            conflicts.setdefault(q, set()).add(p)
+    covered = set()
+    cliques = []
+    for lit in sorted(conflicts, key=lambda p: -len(conflicts[p])):
+        candidates = {q for q in conflicts[lit] if (min(lit, q), max(lit, q)) not in covered}
+        if len(candidates) < min_size - 1:
+            continue
+        clique = [lit]
+        for q in sorted(candidates, key=lambda p: -len(conflicts[p] & candidates)):
+            if q in candidates:
+                clique.append(q)
+                candidates = candidates & conflicts[q]
+        if len(clique) < min_size:
+            continue
+        cliques.append(clique)
+        for p, q in combinations(clique, 2):
+            covered.add((min(p, q), max(p, q)))
+    if not cliques:
+        return cnf
+    reduced = CNF(cnf.num_vars, cnf.declared_clauses)
+    for clause in cnf.clauses():
+        if len(clause) == 2:
+            p, q = clause[0] ^ 1, clause[1] ^ 1
+            if (min(p, q), max(p, q)) in covered:
+                continue
+        reduced.add_clause(clause)
+    reduced.cards = list(cnf.cards)
+    for clique in cliques:
+        reduced.add_card(clique, 1)
+    return reduced
+
+def family_cnf(family, native=True):
+    # CNF of a structured family from generators.py built with native=True: its
+    # (literals, bound) constraints kept native, or encoded pairwise as the plain
+    # families are (bound + 1 subsets, all pairs for at-most-one)
+    num_vars, clauses = family
+    cnf = CNF(num_vars)
+    for clause in clauses:
+        if not isinstance(clause, tuple):
+            cnf.add_clause([encode(x) for x in clause])
+        elif native:
+            cnf.add_card([encode(x) for x in clause[0]], clause[1])
+        else:
+            for subset in combinations(clause[0], clause[1] + 1):
+                cnf.add_clause([encode(-x) for x in subset])
+    return cnf
+
+def formula_bytes(solver):
+    # Clause arena, watch lists and constraint literals of a loaded CDCL solver
+    f = solver.formula
+    total = f.arena.nbytes()
+    total += sum(len(ws) * ws.itemsize for ws in f.watches)
+    total += sum(len(lits) * lits.itemsize for lits in f.cards)
+    total += sum(len(occ) * occ.itemsize for occ in f.card_occ.values())
+    return total
+
+def measure(cnf, detect_amo=False, solve=True):
+    # Load (and solve) with CDCL; returns (answer, load seconds, solve seconds, formula MiB)
+    from CDCL import SATSolverCDCL
+    start_time = time.time()
+    solver = SATSolverCDCL(verbose=False, detect_amo=detect_amo)
+    solver.load(cnf)
+    loaded = time.time() - start_time
+    size = formula_bytes(solver) / (1 << 20)
+    if not solve:
+        return "-", loaded, 0.0, size
+    start_time = time.time()
+    solver.solve()
+    answer = "SAT" if solver.model is not None else "UNSAT"
+    return answer, loaded, time.time() - start_time, size
+
+def main():
+    # Each family with pairwise at-most-one clauses, the same clauses turned into
+    # constraints by find_amo, and native constraints. The larger pigeonhole
+    # instances are only loaded: they are far out of reach of resolution.
+    from generators import php, random_coloring
+    families = [(f"pigeonhole, {n + 1} pigeons in {n} holes", php(n, native=True), True, True) for n in (6, 7)]
+    families += [(f"pigeonhole, {n + 1} pigeons in {n} holes (load only)", php(n, native=True), False, n <= 50)
+                 for n in (50, 100, 200)]
+    families += [(f"{colors}-coloring of a random graph, {nodes} nodes", random_coloring(nodes, 5.0, colors, seed=1, native=True),
+                  True, nodes <= 500) for nodes, colors in ((200, 20), (500, 50), (1000, 100))]
+    for name, family, solve, detect in families:
+        print(f"\n{name}")
+        runs = [("pairwise", family_cnf(family, native=False), False)]
+        if detect:
+            runs.append(("pairwise, detected", runs[0][1], True))
+        runs.append(("native", family_cnf(family), False))
+        for label, cnf, detect_amo in runs:
+            answer, loaded, solved, size = measure(cnf, detect_amo, solve)
+            print(f"  {label:<20} {answer:<6} load {loaded:8.3f}s  solve {solved:8.3f}s  formula {size:8.2f} MiB")
+
+if __name__ == "__main__":
+    main()
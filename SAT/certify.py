@@ -0,0 +1,145 @@
+# Certificates for solver answers. DratWriter logs a DRAT proof of an UNSAT
+# answer (clause additions and deletions, binary or text format) through a large
+# buffer, for checking with drat-trim. check_model verifies a SAT answer by
+# evaluating every clause against the model at once with NumPy.
+#
+#   python certify.py [folder]   proof logging overhead of CDCL on a folder
+import os
+import sys
+import time
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import dimacs
+from cnf import decode, HEADER
+
+BUFFER_SIZE = 1 << 20
+
+class DratWriter:
+    # Proof output for encoded literals. In binary DRAT a clause is 'a' or 'd',
+    # then each literal as a variable-length unsigned int (2 * var + sign for
+    # the DIMACS variable, which is the encoded literal + 2), then 0.
+    def __init__(self, target, binary=True, buffer_size=BUFFER_SIZE):
+        # target: a path, or a file object opened for binary writing
+        self.owned = isinstance(target, (str, bytes, os.PathLike))
+        self.file = open(target, 'wb') if self.owned else target
+        self.binary = binary
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.additions = 0
+        self.deletions = 0
+
+    def write(self, tag, lits):
+        buffer = self.buffer
+        if self.binary:
+            buffer += tag
+            for lit in lits:
+                u = lit + 2
+                while u > 127:
+                    buffer.append(u & 127 | 128)
+                    u >>= 7
+                buffer.append(u)
+            buffer.append(0)
+        else:
+            if tag == b'd':
+                buffer += b'd '
+            buffer += " ".join(str(decode(lit)) for lit in lits).encode()
+            buffer += b' 0\n' if lits else b'0\n'
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def add(self, lits):
+        self.additions += 1
+        self.write(b'a', lits)
+
+    def delete(self, lits):
+        self.deletions += 1
+        self.write(b'd', lits)
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.file.close()
+
+def check_model_slow(cnf, model):
+    true = set(model)
+    return (all(any(decode(lit) in true for lit in clause) for clause in cnf.clauses())
+            and check_cards(cnf, true))
+
+def check_cards(cnf, true):
+    # Cardinality constraints, given the set of true signed literals
+    return all(sum(decode(lit) in true for lit in lits) <= bound for lits, bound in cnf.cards)
+
+def check_model(cnf, model):
+    # True if the model (signed DIMACS literals, as show_result prints them)
+    # satisfies every clause and cardinality constraint. The truth value of every
+    # literal slot in the arena is gathered in one indexing operation and reduced
+    # per clause.
+    if np is None:
+        return check_model_slow(cnf, model)
+    if cnf.cards and not check_cards(cnf, set(model)):
+        return False
+    data = np.frombuffer(cnf.arena.data, dtype=np.int32)
+    crefs = np.fromiter(cnf.arena, dtype=np.int64, count=len(cnf))
+    if not len(crefs):
+        return True
+    sizes = data[crefs - HEADER].astype(np.int64)
+    if not sizes.all():
+        return False  # An empty clause
+    signed = np.asarray(model, dtype=np.int64)
+    signed = signed[(signed != 0) & (np.abs(signed) <= cnf.num_vars)]  # A trailing 0 is no literal
+    truth = np.zeros(2 * cnf.num_vars, dtype=bool)
+    truth[np.where(signed > 0, 2 * signed - 2, -2 * signed - 1)] = True
+    starts = np.cumsum(sizes) - sizes
+    positions = np.arange(sizes.sum()) + np.repeat(crefs - starts, sizes)
+    satisfied = np.logical_or.reduceat(truth[data[positions]], starts)
+    return bool(satisfied.all())
+
+def main():
+    from CDCL import SATSolverCDCL
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    files = sorted(f for f in os.listdir(folder) if f.endswith('.cnf') or f.endswith('.cnf.txt'))
+    total_plain = total_proof = 0.0
+    for filename in files:
+        cnf = dimacs.load(os.path.join(folder, filename))
+        start_time = time.time()
+        solver = SATSolverCDCL(verbose=False)
+        solver.load(cnf)
+        solver.solve()
+        plain = time.time() - start_time
+
+        with tempfile.TemporaryDirectory() as scratch:
+            path = os.path.join(scratch, "proof.drat")
+            start_time = time.time()
+            with SATSolverCDCL(verbose=False, proof=path) as solver:
+                solver.load(cnf)
+                solver.solve()
+            with_proof = time.time() - start_time
+            size = os.path.getsize(path)
+        proof = solver.proof
+        total_plain += plain
+        total_proof += with_proof
+        if solver.model is not None:
+            start_time = time.time()
+            verdict = "model verified" if check_model(cnf, solver.model) else "MODEL WRONG"
+            verdict += f" in {time.time() - start_time:.4f}s"
+        else:
+            verdict = f"proof {proof.additions} additions, {proof.deletions} deletions, {size / 1024:.1f} KiB"
+        print(f"{filename}: {'SAT' if solver.model is not None else 'UNSAT'}, {plain:.4f}s without proof, "
+              f"{with_proof:.4f}s with; {verdict}")
+    if total_plain:
+        print(f"Total: {total_plain:.4f}s without proof, {total_proof:.4f}s with "
+              f"({100 * (total_proof / total_plain - 1):+.1f}%)")
+
+if __name__ == "__main__":
+    main()
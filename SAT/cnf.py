@@ -0,0 +1,113 @@
+# Compact formula representation shared by the solvers.
+# Literals are encoded as 2 * (variable - 1) + sign, so negation is lit ^ 1.
+from array import array
+
+HEADER = 3          # Words stored in front of every clause: size, flags, LBD
+LEARNED = 1
+DELETED = 2
+NO_REASON = -1
+
+def encode(literal):
+    return 2 * (abs(literal) - 1) + (1 if literal < 0 else 0)
+
+def decode(lit):
+    return -(lit // 2 + 1) if lit & 1 else lit // 2 + 1
+
+def encode_all(literals):
+    # Signed DIMACS literals, as the solvers' public methods take them, to encoded ones
+    if 0 in literals:
+        raise ValueError("0 is not a literal")
+    return [encode(literal) for literal in literals]
+
+class ClauseArena:
+    # All clauses back to back in one flat int32 array. A clause is referred to
+    # by the offset of its first literal (its cref); its header sits just before:
+    #   data[cref - 3] = size, data[cref - 2] = flags, data[cref - 1] = LBD
+    def __init__(self):
+        self.data = array('i')
+        self.clause_count = 0
+        self.wasted = 0     # Words held by deleted clauses, reclaimed by compact()
+
+    def add(self, lits, learned=False, lbd=0):
+        data = self.data
+        data.append(len(lits))
+        data.append(LEARNED if learned else 0)
+        data.append(lbd)
+        cref = len(data)
+        data.extend(lits)
+        self.clause_count += 1
+        return cref
+
+    def size(self, cref):
+        return self.data[cref - 3]
+
+    def literals(self, cref):
+        return self.data[cref:cref + self.data[cref - 3]]
+
+    def is_learned(self, cref):
+        return self.data[cref - 2] & LEARNED != 0
+
+    def is_deleted(self, cref):
+        return self.data[cref - 2] & DELETED != 0
+
+    def lbd(self, cref):
+        return self.data[cref - 1]
+
+    def delete(self, cref):
+        self.data[cref - 2] |= DELETED
+        self.wasted += self.data[cref - 3] + HEADER
+        self.clause_count -= 1
+
+    def __iter__(self):
+        # Clause references of all live clauses, in insertion order
+        data = self.data
+        cref = HEADER
+        end = len(data) + HEADER
+        while cref < end:
+            if not data[cref - 2] & DELETED:
+                yield cref
+            cref += data[cref - 3] + HEADER
+
+    def nbytes(self):
+        return len(self.data) * self.data.itemsize
+
+    def compact(self):
+        # Drop deleted clauses; returns a mapping from old to new clause references
+        data = self.data
+        new_data = array('i')
+        remap = {}
+        cref = HEADER
+        end = len(data) + HEADER
+        while cref < end:
+            size = data[cref - 3]
+            if not data[cref - 2] & DELETED:
+                new_data.extend(data[cref - HEADER:cref + size])
+                remap[cref] = len(new_data) - size
+            cref += size + HEADER
+        self.data = new_data
+        self.wasted = 0
+        return remap
+
+class CNF:
+    # A loaded CNF formula: variable count plus an arena of encoded clauses, and
+    # any cardinality constraints (at most bound of the literals true) of an
+    # extended cnf+ input as (literal list, bound) pairs
+    def __init__(self, num_vars=0, declared_clauses=0):
+        self.num_vars = num_vars
+        self.declared_clauses = declared_clauses
+        self.arena = ClauseArena()
+        self.cards = []
+
+    def add_clause(self, lits):
+        return self.arena.add(lits)
+
+    def add_card(self, lits, bound):
+        self.cards.append((list(lits), bound))
+
+    def clauses(self):
+        arena = self.arena
+        for cref in arena:
+            yield arena.literals(cref)
+
+    def __len__(self):
+        return self.arena.clause_count
@@ -0,0 +1,206 @@
+# Binary cache of parsed CNF files. A cache file holds the clause arena exactly
+# as cnf.py lays it out (int32 words, a 3-word header in front of every clause)
+# plus an int64 array with the offset of every clause's first literal, behind a
+# fixed header with the variable and clause counts and a hash of the source
+# file. Loading it is a single copy of the words into the arena, or no copy at
+# all through map_arrays().
+#
+# Cache files live in a directory keyed by the source hash (SAT_CNF_CACHE, or
+# ~/.cache/sat-solver-comparison) that is trimmed to max_bytes, oldest use
+# first, or next to the source file as <file>.cnfb. dimacs.load() looks for
+# both before parsing.
+import os
+import sys
+import time
+import mmap
+import struct
+import hashlib
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from cnf import CNF
+
+MAGIC = b'CNFB'
+VERSION = 1
+# magic, version, num_vars, declared clauses, clause count, arena words,
+# source size, source mtime (ns), source hash
+LAYOUT = struct.Struct('<4sIqqqqqq16s')
+SUFFIX = '.cnfb'
+DEFAULT_DIR = os.environ.get('SAT_CNF_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'sat-solver-comparison'))
+DEFAULT_MAX_BYTES = 4 << 30
+MIN_SOURCE_BYTES = 1 << 20     # Smaller files parse fast enough not to be cached by default
+HASH_CHUNK = 1 << 24
+
+def file_hash(path):
+    # Hash of the raw (possibly compressed) source bytes
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(HASH_CHUNK)
+            if not chunk:
+                return digest.digest()
+            digest.update(chunk)
+
+def sidecar_path(source):
+    return str(source) + SUFFIX
+
+def cache_path(digest, folder=DEFAULT_DIR):
+    return os.path.join(folder, digest.hex() + SUFFIX)
+
+def read_header(mm):
+    if len(mm) < LAYOUT.size or mm[:4] != MAGIC:
+        return None
+    magic, version, num_vars, declared, clauses, words, size, mtime, digest = LAYOUT.unpack_from(mm)
+    if version != VERSION or len(mm) != LAYOUT.size + 4 * words + (4 * words) % 8 + 8 * clauses:
+        return None
+    return {"num_vars": num_vars, "declared_clauses": declared, "clause_count": clauses, "words": words,
+            "source_size": size, "source_mtime": mtime, "hash": digest}
+
+def is_cache_file(path):
+    with open(path, 'rb') as file:
+        return file.read(4) == MAGIC
+
+def store(cnf, path, source=None, digest=None):
+    # Write cnf to path; source (and its hash) identify the file it came from
+    arena = cnf.arena
+    if arena.wasted:
+        arena.compact()
+    data = arena.data
+    offsets = array('q', arena)
+    size = mtime = 0
+    if source is not None:
+        st = os.stat(source)
+        size, mtime = st.st_size, st.st_mtime_ns
+        digest = digest or file_hash(source)
+    header = LAYOUT.pack(MAGIC, VERSION, cnf.num_vars, cnf.declared_clauses, len(offsets), len(data),
+                         size, mtime, digest or bytes(16))
+    if sys.byteorder == 'big':
+        data = array('i', data)
+        data.byteswap()
+        offsets.byteswap()
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"   # Written aside and renamed, so readers never see half a file
+    with open(partial, 'wb') as file:
+        file.write(header)
+        file.write(data.tobytes())
+        file.write(bytes((4 * len(data)) % 8))
+        file.write(offsets.tobytes())
+    os.replace(partial, path)
+
+def load(path):
+    # CNF from a cache file: one copy of the arena words
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header = read_header(mm)
+            if header is None:
+                raise ValueError(f"{path} is not a valid CNF cache file.")
+            cnf = CNF(header["num_vars"], header["declared_clauses"])
+            cnf.arena.data.frombytes(mm[LAYOUT.size:LAYOUT.size + 4 * header["words"]])
+    if sys.byteorder == 'big':
+        cnf.arena.data.byteswap()
+    cnf.arena.clause_count = header["clause_count"]
+    return cnf
+
+def map_arrays(path):
+    # Zero-copy view of a cache file: (header, arena words, clause offsets) as
+    # read-only NumPy memmaps. Literals of clause i are
+    # words[offsets[i]:offsets[i] + words[offsets[i] - 3]].
+    if np is None:
+        raise ImportError("Zero-copy mapping needs NumPy; use load() instead.")
+    header = header_of(path)
+    if header is None:
+        raise ValueError(f"{path} is not a CNF cache file.")
+    words = np.memmap(path, dtype='<i4', mode='r', offset=LAYOUT.size, shape=(header["words"],))
+    start = LAYOUT.size + 4 * header["words"] + (4 * header["words"]) % 8
+    offsets = np.memmap(path, dtype='<i8', mode='r', offset=start, shape=(header["clause_count"],))
+    return header, words, offsets
+
+def header_of(path):
+    with open(path, 'rb') as file:
+        try:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return read_header(mm)
+        except ValueError:  # Empty file
+            return None
+
+def lookup(source, folder=DEFAULT_DIR):
+    # Path of a cache file for source, or None. A sidecar counts if its recorded
+    # size and mtime match the source; the cache directory is keyed by hash.
+    st = os.stat(source)
+    sidecar = sidecar_path(source)
+    if os.path.exists(sidecar):
+        header = header_of(sidecar)
+        if header is not None and (header["source_size"], header["source_mtime"]) == (st.st_size, st.st_mtime_ns):
+            return sidecar
+    if folder is None or not os.path.isdir(folder):
+        return None
+    digest = file_hash(source)
+    path = cache_path(digest, folder)
+    if os.path.exists(path):
+        header = header_of(path)
+        if header is not None and header["hash"] == digest:
+            os.utime(path)  # Mark as recently used for eviction
+            return path
+    return None
+
+def evict(folder=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    # Delete the least recently used cache files until the folder fits max_bytes
+    entries = []
+    for name in os.listdir(folder):
+        if name.endswith(SUFFIX):
+            st = os.stat(os.path.join(folder, name))
+            entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(folder, name))
+        total -= size
+
+def add(cnf, source, folder=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES, sidecar=False):
+    # Cache a freshly parsed CNF of source; returns the cache file path
+    if sidecar:
+        path = sidecar_path(source)
+        store(cnf, path, source)
+        return path
+    digest = file_hash(source)
+    path = cache_path(digest, folder)
+    store(cnf, path, source, digest)
+    evict(folder, max_bytes)
+    return path
+
+def main():
+    # Cold parse against warm load for the largest CNF files given on the command
+    # line (default: the current folder)
+    import dimacs
+    sources = sys.argv[1:] or [f for f in os.listdir('.') if f.endswith(('.cnf', '.cnf.txt', '.cnf.gz', '.cnf.bz2', '.cnf.xz'))]
+    sources = sorted(sources, key=os.path.getsize, reverse=True)[:5]
+    folder = os.path.join(DEFAULT_DIR, 'benchmark')
+    for source in sources:
+        print(f"\n{source} ({os.path.getsize(source) / 2**20:.1f} MiB)")
+        start = time.time()
+        cnf = dimacs.load(source, cache=False)
+        cold = time.time() - start
+        start = time.time()
+        path = add(cnf, source, folder)
+        stored = time.time() - start
+        start = time.time()
+        cached = load(lookup(source, folder))
+        warm = time.time() - start
+        print(f"  clauses: {len(cnf)}, cache file {os.path.getsize(path) / 2**20:.1f} MiB")
+        print(f"  cold parse: {cold:.4f}s, writing cache: {stored:.4f}s")
+        print(f"  warm load (hash + copy): {warm:.4f}s, speedup {cold / warm:.1f}x")
+        if np is not None:
+            start = time.time()
+            header, words, offsets = map_arrays(path)
+            print(f"  zero-copy map: {time.time() - start:.4f}s")
+        assert cached.arena.data == cnf.arena.data
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
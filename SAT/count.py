@@ -0,0 +1,258 @@
+# Exact model counting (#SAT). DPLL-style search (unit propagation, branching on
+# the most frequent variable) with two additions: the residual formula is split
+# into independent components whose counts multiply, and the count of every
+# component is cached under a canonical key, so a component that shows up again
+# in another branch is not searched twice. The cache is an LRU bounded by an
+# estimate of its memory use.
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+import dimacs
+from cardinality import expand_cards
+from stats import SolverStats
+
+DEFAULT_CACHE_BYTES = 256 << 20
+
+class ComponentCache:
+    # LRU map from canonical component keys to counts, with a byte budget
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        size = sys.getsizeof(key) + sys.getsizeof(value) + 100   # Plus dict slot and entry tuple
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, freed) = self.entries.popitem(last=False)
+            self.bytes -= freed
+            self.evictions += 1
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+def canonical_key(clauses):
+    # Clauses are sorted tuples of encoded literals; sorted and packed into bytes
+    # (literal + 1, 0 after each clause), this is the same for equal components
+    flat = array('i')
+    for clause in sorted(clauses):
+        flat.extend([lit + 1 for lit in clause])
+        flat.append(0)
+    return flat.tobytes()
+
+def variables_of(clauses):
+    return {lit >> 1 for clause in clauses for lit in clause}
+
+def simplify(clauses, units):
+    # Assign the literals in units and propagate. Returns (residual clauses, number
+    # of variables assigned), or None on a conflict.
+    assigned = set()
+    while units:
+        for lit in units:
+            if lit ^ 1 in assigned:
+                return None
+            assigned.add(lit)
+        units = []
+        residual = []
+        for clause in clauses:
+            if any(lit in assigned for lit in clause):
+                continue
+            reduced = tuple(lit for lit in clause if lit ^ 1 not in assigned)
+            if not reduced:
+                return None
+            if len(reduced) == 1:
+                if reduced[0] not in assigned:
+                    units.append(reduced[0])
+                continue
+            residual.append(reduced)
+        clauses = residual
+    return clauses, len(assigned)
+
+def components(clauses):
+    # Group clauses by connected variables (union-find with path halving)
+    parent = {}
+
+    def find(var):
+        parent.setdefault(var, var)
+        while parent[var] != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    for clause in clauses:
+        root = find(clause[0] >> 1)
+        for lit in clause[1:]:
+            other = find(lit >> 1)
+            if other != root:
+                parent[other] = root
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(clause[0] >> 1), []).append(clause)
+    return list(groups.values())
+
+class ModelCounter:
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES, components=True, verbose=True):
+        self.cache = ComponentCache(cache_bytes)
+        self.split = components          # False: plain DPLL counting with the cache on whole residual formulas
+        self.verbose = verbose
+        self.literal_count = 0
+        self.clauses = []
+        self.count = None
+        self.stats = SolverStats()
+
+    def initialize(self, lines):
+        self.load(dimacs.parse_lines(lines))
+
+    def load(self, cnf):
+        # Clauses as sorted tuples without duplicate literals; tautologies dropped.
+        # An empty clause is kept as () and makes the count 0. Cardinality
+        # constraints are expanded without auxiliary variables, which would change
+        # the count.
+        cnf = expand_cards(cnf, auxiliary=False)
+        self.literal_count = cnf.num_vars
+        self.clauses = []
+        for clause in cnf.clauses():
+            unique = tuple(sorted(set(clause)))
+            if not any(lit ^ 1 in unique for lit in unique):
+                self.clauses.append(unique)
+
+    def count_formula(self, clauses):
+        # Models of clauses over exactly the variables occurring in them
+        if not clauses:
+            return 1
+        if not self.split:
+            return self.count_component(clauses)
+        total = 1
+        parts = components(clauses)
+        self.stats.components += len(parts)
+        # Smallest first: a component with no models makes the rest irrelevant
+        for part in sorted(parts, key=len):
+            total *= self.count_component(part)
+            if not total:
+                return 0
+        return total
+
+    def count_component(self, clauses):
+        key = canonical_key(clauses)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        occurrences = {}
+        for clause in clauses:
+            for lit in clause:
+                occurrences[lit >> 1] = occurrences.get(lit >> 1, 0) + 1
+        num_vars = len(occurrences)
+        var = max(occurrences, key=occurrences.get)
+        total = 0
+        stats = self.stats
+        for lit in (2 * var, 2 * var + 1):
+            stats.decisions += 1
+            outcome = simplify(clauses, [lit])
+            if outcome is None:
+                stats.conflicts += 1
+                continue
+            residual, assigned = outcome
+            stats.propagations += assigned
+            # Variables that dropped out with their clauses satisfied are free
+            free = num_vars - assigned - len(variables_of(residual))
+            total += self.count_formula(residual) << free
+        self.cache.put(key, total)
+        stats.peak_cache_bytes = max(stats.peak_cache_bytes, self.cache.bytes)
+        return total
+
+    def solve(self):
+        # Exact number of models over all declared variables
+        start = time.perf_counter()
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 4 * self.literal_count + 1000))   # One or two frames per branching level
+        try:
+            units = [clause[0] for clause in self.clauses if len(clause) == 1]
+            outcome = simplify(self.clauses, units) if () not in self.clauses else None
+            if outcome is None:
+                self.count = 0
+            else:
+                residual, assigned = outcome
+                free = self.literal_count - assigned - len(variables_of(residual))
+                self.count = self.count_formula(residual) << free
+        finally:
+            sys.setrecursionlimit(limit)
+        self.stats.cache_hits = self.cache.hits
+        self.stats.cache_misses = self.cache.misses
+        self.stats.solve_time = time.perf_counter() - start
+        if self.verbose:
+            print(f"Models: {self.count}")
+        return self.count
+
+def count_by_enumeration(cnf, limit=None):
+    # Baseline: enumerate models with an incremental CDCL solver, blocking each
+    # one with a clause; stops after limit models
+    from CDCL import SATSolverCDCL, Cat
+    solver = SATSolverCDCL(verbose=False)
+    solver.load(cnf)
+    found = 0
+    while limit is None or found < limit:
+        if solver.solve().status != Cat.SATISFIED:
+            break
+        found += 1
+        solver.add_clause([-lit for lit in solver.model])
+    return found
+
+def compare(name, cnf, enumerate_limit=5000):
+    print(f"\nProcessing {name}...")
+    counter = ModelCounter(verbose=False)
+    counter.load(cnf)
+    start_time = time.time()
+    counter.solve()
+    elapsed = time.time() - start_time
+    stats = counter.stats
+    print(f"Models: {counter.count}")
+    print(f"Counter: {elapsed:.4f} seconds, {stats.decisions} decisions, {stats.components} components, "
+          f"cache hit rate {100 * counter.cache.hit_rate():.1f}% ({stats.cache_hits} hits), "
+          f"peak cache {stats.peak_cache_bytes / 1024:.1f} KiB")
+    start_time = time.time()
+    found = count_by_enumeration(cnf, enumerate_limit)
+    elapsed = time.time() - start_time
+    if found < enumerate_limit:
+        print(f"Enumeration: {found} models in {elapsed:.4f} seconds")
+    else:
+        print(f"Enumeration: stopped after {found} models in {elapsed:.4f} seconds")
+
+def main():
+    # Count every .cnf/.cnf.txt file in the current folder, then structured
+    # families, against enumerating models with CDCL
+    from generators import php, random_coloring, graph_coloring
+    folder = os.getcwd()
+    files = [f for f in os.listdir(folder) if f.endswith('.cnf') or f.endswith('.cnf.txt')]
+    for filename in files:
+        compare(filename, dimacs.load(os.path.join(folder, filename)))
+    families = [
+        ("pigeonhole, 7 pigeons in 7 holes", php(7, pigeons=7)),
+        ("pigeonhole, 7 pigeons in 6 holes", php(6)),
+        ("3-coloring of a 12-cycle", graph_coloring(12, [(i, (i + 1) % 12) for i in range(12)])),
+        ("3-coloring of a random graph, 40 nodes", random_coloring(40, edge_ratio=1.0, seed=1)),
+    ]
+    for name, (num_vars, clauses) in families:
+        lines = [f"p cnf {num_vars} {len(clauses)}\n"] + [" ".join(map(str, clause)) + " 0\n" for clause in clauses]
+        compare(name, dimacs.parse_lines(lines))
+
+if __name__ == "__main__":
+    main()
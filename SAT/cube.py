@@ -0,0 +1,222 @@
+# Cube-and-conquer: a lookahead phase splits the formula into up to 2^depth
+# cubes (conjunctions of decision literals), and a pool of CDCL workers solves
+# them as assumptions. Every worker loads the formula once, from shared memory,
+# and keeps its learned clauses from one cube to the next. The first SAT cube
+# ends the run; the formula is UNSAT once every cube is refuted.
+import os
+import math
+import time
+import queue
+import multiprocessing as mp
+
+import dimacs
+from cnf import NO_REASON, decode
+from CDCL import SATSolverCDCL, Cat
+from portfolio import SharedFormula, attach_formula
+from incremental import random_3sat
+
+SAT = "SAT"
+UNSAT = "UNSAT"
+
+def decide(solver, lit):
+    # Assign lit at a new decision level and propagate; False on a conflict.
+    # The caller backtracks.
+    f = solver.formula
+    f.trail_lim.append(len(f.assign_stack))
+    f.decision_level += 1
+    solver.assign(lit, f.decision_level, NO_REASON)
+    return solver.propagate() is None
+
+def enter_cube(solver, cube):
+    # Decide the cube literals one by one from level 0; False if they conflict
+    solver.backtrack(0)
+    values = solver.formula.values
+    for lit in cube:
+        if values[lit] == 0:
+            return False
+        if values[lit] == -1 and not decide(solver, lit):
+            return False
+    return True
+
+def lookahead(solver, cube, candidates, units):
+    # Pick the splitting variable under cube by propagation impact: the variable
+    # whose two branches imply the most literals (product of both counts, as in
+    # march). A branch that conflicts is a failed literal: its negation is added
+    # as a unit clause and collected in units, or, below the root, appended to the
+    # cube. Returns (cube, best decision literal or None if every candidate is
+    # assigned), or None if the cube itself fails.
+    f = solver.formula
+    while True:
+        if not enter_cube(solver, cube):
+            return None
+        level = f.decision_level
+        values = f.values
+        best = None
+        best_score = -1
+        failed = None
+        for var in candidates:
+            lit = 2 * var
+            if values[lit] != -1:
+                continue
+            implied = []
+            for probe in (lit, lit ^ 1):
+                before = len(f.assign_stack)
+                ok = decide(solver, probe)
+                implied.append(len(f.assign_stack) - before if ok else None)
+                solver.backtrack(level)
+            if implied[0] is None or implied[1] is None:
+                failed = lit if implied[0] is None else lit ^ 1
+                break
+            score = (implied[0] + 1) * (implied[1] + 1)
+            if score > best_score:
+                best, best_score = lit, score
+        if failed is None:
+            return cube, best
+        if level > 0:
+            # Failed under the cube only: the negation holds in this subtree
+            cube = cube + [failed ^ 1]
+            continue
+        solver.backtrack(0)
+        solver.insert_clause([failed ^ 1])
+        units.append(failed ^ 1)
+        if solver.propagate() is not None:
+            return None
+
+def make_cubes(cnf, depth, candidates=30):
+    # Split the formula by repeated lookahead. Returns (cubes, units, refuted):
+    # the cubes still to solve, unit clauses found by failed literal probing, and
+    # the number of cubes refuted during lookahead.
+    solver = SATSolverCDCL(verbose=False)
+    solver.load(cnf)
+    units = []
+    if solver.formula.unsat or solver.propagate() is not None:
+        return [], units, 1
+    occurrences = [0] * cnf.num_vars
+    for clause in cnf.clauses():
+        for lit in clause:
+            occurrences[lit >> 1] += 1
+    order = sorted(range(cnf.num_vars), key=lambda v: -occurrences[v])
+    cubes = []
+    refuted = 0
+    frontier = [[]]
+    for _ in range(depth):
+        next_frontier = []
+        for cube in frontier:
+            # Candidates: the most frequent variables still unassigned under the cube
+            if not enter_cube(solver, cube):
+                refuted += 1
+                continue
+            values = solver.formula.values
+            free = [v for v in order if values[2 * v] == -1][:candidates]
+            split = lookahead(solver, cube, free, units)
+            if split is None:
+                refuted += 1
+                continue
+            cube, lit = split
+            if lit is None:
+                cubes.append(cube)  # Nothing left to split on
+            else:
+                next_frontier.append(cube + [lit])
+                next_frontier.append(cube + [lit ^ 1])
+        frontier = next_frontier
+    return cubes + frontier, units, refuted
+
+def worker(handle, units, tasks, results):
+    # One loaded solver per process; cubes arrive as assumption lists
+    solver = SATSolverCDCL(verbose=False)
+    solver.load(attach_formula(handle))
+    for lit in units:
+        solver.insert_clause([lit])
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        number, cube = task
+        start = time.time()
+        result = solver.solve([decode(lit) for lit in cube])
+        status = SAT if result.status == Cat.SATISFIED else UNSAT
+        results.put((number, status, result.model, time.time() - start, os.getpid()))
+
+def default_depth(jobs):
+    # A few cubes per core, so that a core finishing early can take more work
+    return max(1, math.ceil(math.log2(max(jobs, 1)))) + 2
+
+def solve_cubes(cnf, jobs=None, depth=None, candidates=30):
+    # Returns a dict with the status, the model, the number of cubes made and
+    # refuted during lookahead, the cube that was SAT, and the lookahead and
+    # total times
+    jobs = jobs or os.cpu_count() or 1
+    depth = depth or default_depth(jobs)
+    start = time.time()
+    cubes, units, refuted = make_cubes(cnf, depth, candidates)
+    outcome = {"status": UNSAT, "model": None, "cubes": len(cubes) + refuted, "refuted": refuted,
+               "sat_cube": None, "solved": 0, "depth": depth, "jobs": jobs,
+               "lookahead_time": time.time() - start, "time": 0.0}
+    if not cubes:
+        outcome["time"] = time.time() - start
+        return outcome
+    shared = SharedFormula(cnf)
+    tasks = mp.Queue()
+    results = mp.Queue()
+    for task in enumerate(cubes):
+        tasks.put(task)
+    workers = []
+    for _ in range(min(jobs, len(cubes))):
+        tasks.put(None)
+        process = mp.Process(target=worker, args=(shared.handle, units, tasks, results), daemon=True)
+        process.start()
+        workers.append(process)
+    try:
+        while outcome["solved"] < len(cubes):
+            try:
+                number, status, model, elapsed, pid = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(process.is_alive() for process in workers):
+                    raise RuntimeError("Cube workers exited without solving every cube.")
+                continue
+            outcome["solved"] += 1
+            if status == SAT:
+                outcome.update(status=SAT, model=model, sat_cube=cubes[number])
+                break
+    finally:
+        # Stop at the first SAT cube; workers still solving are terminated
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+        tasks.close()
+        results.close()
+        shared.close()
+    outcome["time"] = time.time() - start
+    return outcome
+
+def compare(name, cnf, jobs):
+    print(f"\nProcessing {name}...")
+    start_time = time.time()
+    solver = SATSolverCDCL(verbose=False)
+    solver.load(cnf)
+    solver.solve()
+    single = time.time() - start_time
+
+    outcome = solve_cubes(cnf, jobs)
+    print(f"Result: {'SAT' if solver.model is not None else 'UNSAT'} (cube-and-conquer: {outcome['status']})")
+    print(f"Cubes: {outcome['cubes']} at depth {outcome['depth']}, {outcome['refuted']} refuted by lookahead, "
+          f"{outcome['solved']} solved on {jobs} cores")
+    print(f"Single-core CDCL: {single:.4f} seconds")
+    print(f"Cube-and-conquer: {outcome['time']:.4f} seconds (lookahead {outcome['lookahead_time']:.4f}, "
+          f"speedup {single / outcome['time']:.2f}x)")
+
+def main():
+    # Compare single-core CDCL with cube-and-conquer on every .cnf/.cnf.txt file
+    # in the current folder, then on larger random 3-SAT instances near the
+    # satisfiability threshold
+    folder = os.getcwd()
+    files = [f for f in os.listdir(folder) if f.endswith('.cnf') or f.endswith('.cnf.txt')]
+    jobs = os.cpu_count() or 1
+    for filename in files:
+        compare(filename, dimacs.load(os.path.join(folder, filename)), jobs)
+    for num_vars, seed in ((150, 1), (175, 2), (200, 3)):
+        compare(f"random 3-SAT, {num_vars} variables", dimacs.parse_lines(random_3sat(num_vars, 4.26, seed)), jobs)
+
+if __name__ == "__main__":
+    main()
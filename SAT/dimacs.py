@@ -0,0 +1,276 @@
+# Shared DIMACS CNF loader for DP, DPLL and CDCL.
+# Plain files are memory-mapped; .gz, .bz2 and .xz files are decompressed on the
+# fly. Input is tokenized a chunk at a time with bytes.split, so clauses may span
+# lines (and chunks) and the whole text is never held in memory at once.
+# NumPy is used for tokenizing and encoding when it is installed. Large files
+# are cached in a binary form after the first parse (cnfcache.py).
+# The extended "p cnf+" format adds cardinality constraints, one per line:
+# literals, then "<= bound" or ">= bound" (see cardinality.py).
+import os
+import bz2
+import gzip
+import lzma
+import mmap
+import re
+import warnings
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from cnf import CNF
+import cnfcache
+
+CHUNK_SIZE = 1 << 24
+COMMENT = re.compile(rb'^[ \t\r]*c[^\n]*', re.MULTILINE)
+PROBLEM = re.compile(rb'^[ \t\r]*p[ \t]+cnf(\+?)[ \t]+(\d+)[ \t]+(\d+)[^\n]*', re.MULTILINE)
+CARD = re.compile(rb'^[ \t\r]*((?:-?\d+[ \t]+)*?)(?:0[ \t]*)?([<>]=)[ \t]*(-?\d+)[ \t\r]*$', re.MULTILINE)
+END_MARKER = re.compile(rb'^[ \t\r]*%', re.MULTILINE)  # SATLIB files end with '%'
+
+OPENERS = {
+    b'\x1f\x8b': gzip.open,
+    b'BZh': bz2.open,
+    b'\xfd7zXZ\x00': lzma.open,
+}
+
+def open_compressed(path):
+    # Detect compression from magic bytes rather than the file name
+    with open(path, 'rb') as file:
+        magic = file.read(6)
+    for prefix, opener in OPENERS.items():
+        if magic.startswith(prefix):
+            return opener(path, 'rb')
+    return None
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    stream = open_compressed(path)
+    if stream is not None:
+        with stream:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+    with open(path, 'rb') as file:
+        try:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return
+        with mm:
+            for pos in range(0, len(mm), chunk_size):
+                yield mm[pos:pos + chunk_size]
+
+def split_lines(chunks):
+    # Re-cut arbitrary chunks on line boundaries so no token or comment is split
+    rest = b''
+    for chunk in chunks:
+        chunk = rest + chunk
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            rest = chunk
+            continue
+        rest = chunk[cut:]
+        yield chunk[:cut]
+    if rest:
+        yield rest
+
+class DimacsReader:
+    # Incremental parser; feed() takes text made of whole lines
+    def __init__(self, name="<input>"):
+        self.name = name
+        self.cnf = None
+        self.pending = array('i')   # Encoded literals of a clause still waiting for its 0
+        self.extended = False       # cnf+ header: cardinality constraint lines allowed
+        self.done = False
+
+    def feed(self, text):
+        if self.done:
+            return
+        end = END_MARKER.search(text)
+        if end:
+            text = text[:end.start()]
+            self.done = True
+        if b'c' in text:
+            text = COMMENT.sub(b'', text)
+        if self.cnf is None:
+            header = PROBLEM.search(text)
+            if header is None:
+                if text.split():
+                    raise ValueError("CNF header line (starting with 'p') missing.")
+                return
+            if text[:header.start()].split():
+                raise ValueError("CNF header line (starting with 'p') missing.")
+            self.cnf = CNF(int(header.group(2)), int(header.group(3)))
+            self.extended = header.group(1) == b'+'
+            text = text[header.end():]
+        if self.extended and b'=' in text:
+            text = self.read_cards(text)
+        if not text or text.isspace():
+            return
+        if np is not None:
+            self.append_array(self.tokenize(text))
+            return
+        try:
+            ints = list(map(int, text.split()))
+        except ValueError:
+            raise ValueError(f"Malformed clause data in {self.name}.") from None
+        if not ints:
+            return
+        num_vars = self.cnf.num_vars
+        if max(ints) > num_vars or -min(ints) > num_vars:
+            bad = next(x for x in ints if abs(x) > num_vars)
+            raise IndexError(f"Literal {bad} exceeds declared variable count {num_vars}.")
+        self.append_clauses(ints)
+
+    def read_cards(self, text):
+        # Take the constraint lines out of text; "at least bound" becomes "at most
+        # n - bound" of the negated literals
+        num_vars = self.cnf.num_vars
+        for match in CARD.finditer(text):
+            ints = list(map(int, match.group(1).split()))
+            if 0 in ints:
+                raise ValueError(f"Malformed cardinality constraint in {self.name}.")
+            bad = next((x for x in ints if abs(x) > num_vars), None)
+            if bad is not None:
+                raise IndexError(f"Literal {bad} exceeds declared variable count {num_vars}.")
+            lits = [2 * x - 2 if x > 0 else -2 * x - 1 for x in ints]
+            bound = int(match.group(3))
+            if match.group(2) == b'>=':
+                lits = [lit ^ 1 for lit in lits]
+                bound = len(lits) - bound
+            self.cnf.add_card(lits, bound)
+        return CARD.sub(b'', text)
+
+    def tokenize(self, text):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            try:
+                ints = np.fromstring(text, dtype=np.int64, sep=' ')
+            except (ValueError, DeprecationWarning):
+                raise ValueError(f"Malformed clause data in {self.name}.") from None
+        num_vars = self.cnf.num_vars
+        if len(ints) and np.abs(ints).max() > num_vars:
+            bad = ints[np.flatnonzero(np.abs(ints) > num_vars)[0]]
+            raise IndexError(f"Literal {bad} exceeds declared variable count {num_vars}.")
+        return ints
+
+    def append_array(self, ints):
+        # Vectorized append_clauses: the literal at raw position p of clause i lands
+        # at p + 2 * i + 3 in the arena, because every clause trades its 0 for a
+        # three-word header
+        zeros = np.flatnonzero(ints == 0)
+        if not len(zeros):
+            self.pending.extend(np.where(ints > 0, 2 * ints - 2, -2 * ints - 1).astype(np.int32).tolist())
+            return
+        complete = ints[:zeros[-1] + 1]
+        tail = ints[zeros[-1] + 1:]
+        is_end = complete == 0
+        clause_index = np.cumsum(is_end) - is_end
+        starts = np.concatenate(([0], zeros[:-1] + 1))
+        out = np.zeros(len(complete) + 2 * len(zeros), dtype=np.int32)
+        out[starts + 2 * np.arange(len(zeros))] = zeros - starts
+        literal = ~is_end
+        lits = complete[literal]
+        out[np.flatnonzero(literal) + 2 * clause_index[literal] + 3] = np.where(lits > 0, 2 * lits - 2, -2 * lits - 1)
+        if self.pending:
+            # The first clause continues literals left over from the previous chunk
+            first = out[3:3 + out[0]].tolist()
+            self.cnf.add_clause(self.pending + array('i', first))
+            self.pending = array('i')
+            out = out[3 + len(first):]
+            self.cnf.arena.clause_count -= 1
+        arena = self.cnf.arena
+        arena.data.frombytes(out.tobytes())
+        arena.clause_count += len(zeros)
+        if len(tail):
+            self.pending.extend(np.where(tail > 0, 2 * tail - 2, -2 * tail - 1).astype(np.int32).tolist())
+
+    def append_clauses(self, ints):
+        # Write clauses straight into the arena layout: header words, then literals
+        encoded = [2 * x - 2 if x > 0 else -2 * x - 1 for x in ints]
+        arena = self.cnf.arena
+        data = arena.data
+        start = 0
+        count = 0
+        index = ints.index
+        try:
+            while True:
+                end = index(0, start)
+                if self.pending:
+                    data.append(len(self.pending) + end - start)
+                    data.append(0)
+                    data.append(0)
+                    data.extend(self.pending)
+                    self.pending = array('i')
+                else:
+                    data.append(end - start)
+                    data.append(0)
+                    data.append(0)
+                data.extend(encoded[start:end])
+                count += 1
+                start = end + 1
+        except ValueError:
+            self.pending.extend(encoded[start:])
+        arena.clause_count += count
+
+    def finish(self):
+        if self.cnf is None:
+            return CNF()
+        if self.pending:  # Append any unfinished clause
+            self.cnf.add_clause(self.pending)
+            self.pending = array('i')
+        return self.cnf
+
+def load(path, cache=None):
+    # Parse a DIMACS file (optionally gzip/bz2/xz compressed) into a CNF. Binary
+    # cache files (see cnfcache.py) are loaded directly, and so is a cached copy
+    # of a DIMACS file when there is one. A parsed file is added to the cache if
+    # cache is True, or if cache is None and the file is large enough for parsing
+    # to matter; cache=False neither reads nor writes the cache.
+    if cache is not False:
+        if cnfcache.is_cache_file(path):
+            return cnfcache.load(path)
+        cached = cnfcache.lookup(path)
+        if cached is not None:
+            return cnfcache.load(cached)
+    cnf = parse_file(path)
+    if cnf.cards:  # The binary format holds clauses only
+        return cnf
+    if cache or (cache is None and os.path.getsize(path) >= cnfcache.MIN_SOURCE_BYTES):
+        try:
+            cnfcache.add(cnf, path)
+        except OSError:  # The cache is an optimization; a read-only disk is fine
+            pass
+    return cnf
+
+def parse_file(path):
+    reader = DimacsReader(str(path))
+    for text in split_lines(read_chunks(path)):
+        reader.feed(text)
+        if reader.done:
+            break
+    return reader.finish()
+
+def parse_lines(lines):
+    # Parse already-read text lines (str or bytes) into a CNF
+    reader = DimacsReader()
+    batch = []
+    size = 0
+    for line in lines:
+        if isinstance(line, str):
+            line = line.encode()
+        if not line.endswith(b'\n'):
+            line += b'\n'
+        batch.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            reader.feed(b''.join(batch))
+            batch = []
+            size = 0
+        if reader.done:
+            break
+    if batch:
+        reader.feed(b''.join(batch))
+    return reader.finish()
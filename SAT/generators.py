@@ -0,0 +1,248 @@
+# Benchmark instance generators. Every family is deterministic for a given seed.
+# Random k-SAT is drawn with NumPy a chunk of clauses at a time and formatted
+# in bulk, so multi-million clause instances take seconds; the structured
+# families (pigeonhole, graph coloring, parity) are small enough for plain Python.
+# Output is plain DIMACS, or gzip/bz2/xz compressed when the file name ends in
+# .gz/.bz2/.xz (or compress= says so).
+#
+#   python generators.py ksat out.cnf --vars 100000 --k 3 --ratio 4.267 --seed 1
+#   python generators.py php php8.cnf --n 8
+#   python generators.py suite ../scaling --k 3 --sizes 1000,10000,100000
+import os
+import bz2
+import gzip
+import lzma
+import random
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_CLAUSES = 1 << 18
+BUFFER_SIZE = 1 << 22
+
+# Clause/variable ratio at the satisfiability threshold of random k-SAT
+THRESHOLD = {2: 1.0, 3: 4.267, 4: 9.931, 5: 21.117, 6: 43.37, 7: 87.79}
+
+OPENERS = {
+    "gz": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+def open_output(path, compress=None):
+    if compress is None:
+        compress = next((ext for ext in OPENERS if str(path).endswith("." + ext)), None)
+    if compress is None:
+        return open(path, 'wb')
+    if compress not in OPENERS:
+        raise ValueError(f"Unknown compression '{compress}'. Choose from: {', '.join(OPENERS)}.")
+    return OPENERS[compress](path, 'wb')
+
+def format_clauses(chunk):
+    # DIMACS text of a chunk: a 2-D integer array with one clause per row, or a
+    # list of clauses. A row of the array is formatted by one "%d ... 0" pattern,
+    # so the whole chunk is a single string formatting call. In a list, a
+    # (literals, bound) tuple is a cardinality constraint, written as cnf+ does.
+    if np is not None and isinstance(chunk, np.ndarray):
+        rows, width = chunk.shape
+        if not rows:
+            return b''
+        return ((("%d " * width) + "0\n") * rows % tuple(chunk.ravel().tolist())).encode()
+    return "".join(" ".join(map(str, clause[0])) + f" <= {clause[1]}\n" if isinstance(clause, tuple)
+                   else " ".join(map(str, clause)) + " 0\n" for clause in chunk).encode()
+
+def write_cnf(path, num_vars, num_clauses, chunks, comments=(), compress=None, extended=False):
+    # Write a DIMACS file from an iterable of clause chunks, in large buffers;
+    # extended gives the cnf+ header of files with cardinality constraints
+    with open_output(path, compress) as out:
+        problem = "cnf+" if extended else "cnf"
+        header = "".join(f"c {line}\n" for line in comments) + f"p {problem} {num_vars} {num_clauses}\n"
+        buffer = [header.encode()]
+        size = len(buffer[0])
+        for chunk in chunks:
+            text = format_clauses(chunk)
+            buffer.append(text)
+            size += len(text)
+            if size >= BUFFER_SIZE:
+                out.write(b''.join(buffer))
+                buffer = []
+                size = 0
+        out.write(b''.join(buffer))
+
+def random_rows(rng, num_vars, rows, k):
+    # rows clauses of k distinct variables with random signs; rows that drew a
+    # variable twice are redrawn until none is left
+    variables = rng.integers(1, num_vars + 1, size=(rows, k))
+    while k > 1:
+        ordered = np.sort(variables, axis=1)
+        repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if not len(repeated):
+            break
+        variables[repeated] = rng.integers(1, num_vars + 1, size=(len(repeated), k))
+    signs = rng.integers(0, 2, size=(rows, k)) * 2 - 1
+    return variables * signs
+
+def random_clauses(num_vars, num_clauses, lengths=(3, 3), seed=0, chunk_size=CHUNK_CLAUSES):
+    # Chunks of uniform random clauses, each with a length drawn from the
+    # inclusive range lengths; within a chunk, clauses are grouped by length
+    if np is None:
+        raise ImportError("Random CNF generation needs NumPy.")
+    if lengths[1] > num_vars:
+        raise ValueError(f"Clauses of length {lengths[1]} need at least as many variables.")
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_clauses, chunk_size):
+        rows = min(chunk_size, num_clauses - start)
+        if lengths[0] == lengths[1]:
+            yield random_rows(rng, num_vars, rows, lengths[0])
+            continue
+        sizes = rng.integers(lengths[0], lengths[1] + 1, size=rows)
+        for k in range(lengths[0], lengths[1] + 1):
+            count = int((sizes == k).sum())
+            if count:
+                yield random_rows(rng, num_vars, count, k)
+
+def random_ksat(num_vars, k=3, ratio=None, seed=0):
+    # Uniform random k-SAT; by default at the satisfiability threshold.
+    # Returns (num_vars, num_clauses, chunks).
+    ratio = THRESHOLD[k] if ratio is None else ratio
+    num_clauses = int(round(num_vars * ratio))
+    return num_vars, num_clauses, random_clauses(num_vars, num_clauses, (k, k), seed)
+
+def php(n, pigeons=None, native=False):
+    # Pigeonhole principle: n + 1 pigeons (or pigeons) in n holes, UNSAT with
+    # more pigeons than holes. Variable i * n + j + 1 puts pigeon i in hole j.
+    # With native, each hole gets one at-most-one constraint instead of a clause
+    # per pair of pigeons.
+    pigeons = n + 1 if pigeons is None else pigeons
+    clauses = []
+    for i in range(pigeons):
+        clauses.append([i * n + j + 1 for j in range(n)])
+    for j in range(n):
+        holders = [i * n + j + 1 for i in range(pigeons)]
+        clauses.extend(at_most_one(holders, native))
+    return n * pigeons, clauses
+
+def at_most_one(lits, native=False):
+    # Pairwise clauses, or a single (literals, bound) cardinality constraint
+    if native:
+        return [(lits, 1)]
+    return [[-lits[i], -lits[k]] for i in range(len(lits)) for k in range(i + 1, len(lits))]
+
+def random_graph(num_nodes, num_edges, seed=0):
+    # num_edges distinct edges of G(n, m), as sorted (u, v) pairs
+    rng = random.Random(seed)
+    possible = num_nodes * (num_nodes - 1) // 2
+    if num_edges > possible:
+        raise ValueError(f"A graph on {num_nodes} nodes has at most {possible} edges.")
+    edges = set()
+    while len(edges) < num_edges:
+        u, v = rng.sample(range(num_nodes), 2)
+        edges.add((min(u, v), max(u, v)))
+    return sorted(edges)
+
+def graph_coloring(num_nodes, edges, colors=3, native=False):
+    # k-coloring: variable node * colors + c + 1 gives node its color c. With
+    # native, "at most one color per node" is a cardinality constraint.
+    clauses = []
+    for node in range(num_nodes):
+        base = node * colors
+        clauses.append([base + c + 1 for c in range(colors)])
+        clauses.extend(at_most_one([base + c + 1 for c in range(colors)], native))
+    for u, v in edges:
+        for c in range(colors):
+            clauses.append([-(u * colors + c + 1), -(v * colors + c + 1)])
+    return num_nodes * colors, clauses
+
+def random_coloring(num_nodes, edge_ratio=2.3, colors=3, seed=0, native=False):
+    # Coloring of a random graph with edge_ratio * num_nodes edges; 3-coloring
+    # gets hard around an average degree of 4.6
+    num_edges = min(int(round(num_nodes * edge_ratio)), num_nodes * (num_nodes - 1) // 2)
+    return graph_coloring(num_nodes, random_graph(num_nodes, num_edges, seed), colors, native)
+
+def xor_chain(variables, parity, next_var, clauses):
+    # Tseitin chain t_i = t_{i-1} xor x_i ending in the constraint t = parity;
+    # returns the next free variable
+    acc = variables[0]
+    for x in variables[1:]:
+        t = next_var
+        next_var += 1
+        clauses.append([-t, acc, x])
+        clauses.append([-t, -acc, -x])
+        clauses.append([t, -acc, x])
+        clauses.append([t, acc, -x])
+        acc = t
+    clauses.append([acc if parity else -acc])
+    return next_var
+
+def parity(n, satisfiable=True, seed=0):
+    # Two XOR chains over x1..xn, the second in shuffled order. They demand the
+    # same parity (SAT) or opposite parities (UNSAT, hard for resolution when
+    # the orders differ).
+    rng = random.Random(seed)
+    variables = list(range(1, n + 1))
+    shuffled = variables[:]
+    rng.shuffle(shuffled)
+    target = rng.randrange(2)
+    clauses = []
+    next_var = xor_chain(variables, target, n + 1, clauses)
+    next_var = xor_chain(shuffled, target if satisfiable else 1 - target, next_var, clauses)
+    return next_var - 1, clauses
+
+def write_family(path, family, compress=None):
+    # Write a (num_vars, clauses) pair from one of the structured families
+    num_vars, clauses = family
+    extended = any(isinstance(clause, tuple) for clause in clauses)
+    write_cnf(path, num_vars, len(clauses), [clauses], compress=compress, extended=extended)
+
+def scaling_suite(folder, sizes, k=3, ratio=None, seed=0, compress=None):
+    # One random k-SAT instance per size, all from the same seed; returns the paths
+    os.makedirs(folder, exist_ok=True)
+    ratio = THRESHOLD[k] if ratio is None else ratio
+    suffix = f".{compress}" if compress else ""
+    paths = []
+    for num_vars in sizes:
+        path = os.path.join(folder, f"k{k}_n{num_vars}_r{ratio:g}_s{seed}.cnf{suffix}")
+        num_vars, num_clauses, chunks = random_ksat(num_vars, k, ratio, seed)
+        write_cnf(path, num_vars, num_clauses, chunks,
+                  comments=[f"random {k}-SAT, ratio {ratio:g}, seed {seed}"], compress=compress)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate benchmark CNF instances.")
+    parser.add_argument("family", choices=["ksat", "php", "coloring", "parity", "suite"])
+    parser.add_argument("output", help="output file (folder for suite); .gz/.bz2/.xz compresses")
+    parser.add_argument("--vars", type=int, default=1000, help="variables (ksat), nodes (coloring), chain length (parity)")
+    parser.add_argument("--k", type=int, default=3, help="clause length (ksat, suite) or colors (coloring)")
+    parser.add_argument("--ratio", type=float, help="clauses per variable (ksat, suite) or edges per node (coloring)")
+    parser.add_argument("--n", type=int, default=4, help="holes (php)")
+    parser.add_argument("--unsat", action="store_true", help="unsatisfiable parity instance")
+    parser.add_argument("--native", action="store_true", help="at-most-one as cardinality constraints, cnf+ output (php, coloring)")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated variable counts (suite)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compress", choices=list(OPENERS))
+    args = parser.parse_args()
+
+    if args.family == "ksat":
+        num_vars, num_clauses, chunks = random_ksat(args.vars, args.k, args.ratio, args.seed)
+        write_cnf(args.output, num_vars, num_clauses, chunks,
+                  comments=[f"random {args.k}-SAT, seed {args.seed}"], compress=args.compress)
+    elif args.family == "php":
+        write_family(args.output, php(args.n, native=args.native), args.compress)
+    elif args.family == "coloring":
+        ratio = 2.3 if args.ratio is None else args.ratio
+        write_family(args.output, random_coloring(args.vars, ratio, args.k, args.seed, args.native), args.compress)
+    elif args.family == "parity":
+        write_family(args.output, parity(args.vars, not args.unsat, args.seed), args.compress)
+    else:
+        sizes = [int(size) for size in args.sizes.split(",")]
+        for path in scaling_suite(args.output, sizes, args.k, args.ratio, args.seed, args.compress):
+            print(f"Generated {path}")
+        return
+    print(f"Generated {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# Decision heuristics for SATSolverCDCL. Variables are 0-based and literals use
+# the solver's 2 * var + sign encoding.
+import random
+
+class VarHeap:
+    # Indexed binary max-heap of variables ordered by an external activity list
+    def __init__(self, activity, variables):
+        self.activity = activity
+        self.heap = list(variables)
+        self.position = [-1] * len(activity)
+        for i, var in enumerate(self.heap):
+            self.position[var] = i
+        for i in range(len(self.heap) // 2 - 1, -1, -1):
+            self.sift_down(i)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, var):
+        return self.position[var] >= 0
+
+    def sift_up(self, i):
+        heap = self.heap
+        position = self.position
+        activity = self.activity
+        var = heap[i]
+        act = activity[var]
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if activity[p] >= act:
+                break
+            heap[i] = p
+            position[p] = i
+            i = parent
+        heap[i] = var
+        position[var] = i
+
+    def sift_down(self, i):
+        heap = self.heap
+        position = self.position
+        activity = self.activity
+        n = len(heap)
+        var = heap[i]
+        act = activity[var]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            c = heap[child]
+            if activity[c] <= act:
+                break
+            heap[i] = c
+            position[c] = i
+            i = child
+        heap[i] = var
+        position[var] = i
+
+    def insert(self, var):
+        if self.position[var] >= 0:
+            return
+        self.position[var] = len(self.heap)
+        self.heap.append(var)
+        self.sift_up(len(self.heap) - 1)
+
+    def increase(self, var):
+        # Restore heap order after the activity of var went up
+        if self.position[var] >= 0:
+            self.sift_up(self.position[var])
+
+    def pop(self):
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.position[top] = -1
+        if heap:
+            heap[0] = last
+            self.position[last] = 0
+            self.sift_down(0)
+        return top
+
+class StaticOrder:
+    # Baseline: the first unassigned variable in index order, always positive
+    def __init__(self, num_vars, seed=None):
+        self.num_vars = num_vars
+
+    def add_var(self):
+        self.num_vars += 1
+
+    def bump(self, var):
+        pass
+
+    def decay(self):
+        pass
+
+    def on_unassign(self, var, lit):
+        pass
+
+    def set_phase(self, var, sign):
+        pass  # Always positive
+
+    def pick(self, values):
+        for var in range(self.num_vars):
+            if values[2 * var] == -1:
+                return 2 * var
+        return None
+
+class VSIDS:
+    # EVSIDS: bumps grow geometrically instead of decaying every activity, and
+    # all activities are rescaled once they get too large for a float. A seed
+    # randomizes the initial order and phases, to diversify portfolio runs.
+    def __init__(self, num_vars, decay=0.95, phase_saving=True, seed=None):
+        self.activity = [0.0] * num_vars
+        self.increment = 1.0
+        self.decay_factor = 1.0 / decay
+        self.phase_saving = phase_saving
+        self.phase = [0] * num_vars    # Saved sign: 0 positive, 1 negative
+        self.rng = None if seed is None else random.Random(seed)
+        if self.rng is not None:
+            self.activity[:] = [self.rng.random() * 1e-5 for _ in range(num_vars)]
+            self.phase = [self.rng.randrange(2) for _ in range(num_vars)]
+        self.heap = VarHeap(self.activity, range(num_vars))
+
+    def add_var(self):
+        # One more variable, for clauses added between incremental solves
+        var = len(self.activity)
+        self.activity.append(0.0 if self.rng is None else self.rng.random() * 1e-5)
+        self.phase.append(0 if self.rng is None else self.rng.randrange(2))
+        self.heap.position.append(-1)
+        self.heap.insert(var)
+
+    def bump(self, var):
+        activity = self.activity
+        activity[var] += self.increment
+        if activity[var] > 1e100:
+            for i in range(len(activity)):
+                activity[i] *= 1e-100
+            self.increment *= 1e-100
+        self.heap.increase(var)
+
+    def decay(self):
+        self.increment *= self.decay_factor
+
+    def set_phase(self, var, sign):
+        self.phase[var] = sign
+
+    def on_unassign(self, var, lit):
+        # Lazy reinsertion: assigned variables stay out of the heap until backtrack
+        if self.phase_saving:
+            self.phase[var] = lit & 1
+        self.heap.insert(var)
+
+    def pick(self, values):
+        heap = self.heap
+        while heap:
+            var = heap.pop()
+            if values[2 * var] == -1:
+                return 2 * var | self.phase[var]
+        return None
+
+HEURISTICS = {
+    "static": StaticOrder,
+    "vsids": VSIDS,
+}
+
+def make_heuristic(name, num_vars, seed=None):
+    if name not in HEURISTICS:
+        raise ValueError(f"Unknown decision heuristic '{name}'. Choose from: {', '.join(HEURISTICS)}.")
+    return HEURISTICS[name](num_vars, seed=seed)
@@ -0,0 +1,69 @@
+# Benchmark of the incremental CDCL interface: N related queries (one base
+# formula, a few unit assumptions each) answered by N fresh solvers that re-parse
+# the formula with the assumptions as unit clauses, against one solver that is
+# loaded once and called with solve(assumptions), keeping its learned clauses.
+import sys
+import time
+import random
+
+from CDCL import SATSolverCDCL, Cat
+
+def random_3sat(num_vars, ratio, seed):
+    # DIMACS lines of a uniform random 3-SAT formula
+    rng = random.Random(seed)
+    num_clauses = int(num_vars * ratio)
+    lines = [f"p cnf {num_vars} {num_clauses}\n"]
+    for _ in range(num_clauses):
+        clause = [v if rng.random() < 0.5 else -v for v in rng.sample(range(1, num_vars + 1), 3)]
+        lines.append(" ".join(map(str, clause)) + " 0\n")
+    return lines
+
+def random_queries(num_vars, count, size, seed):
+    rng = random.Random(seed)
+    return [[v if rng.random() < 0.5 else -v for v in rng.sample(range(1, num_vars + 1), size)]
+            for _ in range(count)]
+
+def solve_fresh(lines, queries):
+    # Today's workflow: a new solver per query, assumptions added as unit clauses
+    answers = []
+    header = lines[0].split()
+    for query in queries:
+        query_lines = [f"p cnf {header[2]} {int(header[3]) + len(query)}\n"] + lines[1:]
+        query_lines += [f"{lit} 0\n" for lit in query]
+        solver = SATSolverCDCL(verbose=False)
+        solver.initialize(query_lines)
+        solver.solve()
+        answers.append(solver.result)
+    return answers
+
+def solve_incremental(lines, queries):
+    solver = SATSolverCDCL(verbose=False)
+    solver.initialize(lines)
+    return [solver.solve(query).status for query in queries]
+
+def main():
+    # python incremental.py [variables] [queries] [assumptions per query]
+    num_vars = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    size = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    lines = random_3sat(num_vars, 3.0, seed=1)
+    queries = random_queries(num_vars, count, size, seed=2)
+    print(f"Random 3-SAT, {num_vars} variables, {len(lines) - 1} clauses; {count} queries of {size} assumptions")
+
+    start_time = time.time()
+    fresh = solve_fresh(lines, queries)
+    fresh_time = time.time() - start_time
+
+    start_time = time.time()
+    incremental = solve_incremental(lines, queries)
+    incremental_time = time.time() - start_time
+
+    if fresh != incremental:
+        print("Answers differ between fresh and incremental solving!")
+    satisfiable = sum(1 for result in incremental if result == Cat.SATISFIED)
+    print(f"Satisfiable queries: {satisfiable}/{count}")
+    print(f"Fresh solver per query: {fresh_time:.4f} seconds")
+    print(f"Incremental solver: {incremental_time:.4f} seconds (speedup {fresh_time / incremental_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
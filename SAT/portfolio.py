@@ -0,0 +1,156 @@
+# Portfolio solving: race several engine configurations on one formula, one
+# process each, and take the first definitive SAT/UNSAT answer. The encoded
+# clause arena is placed in shared memory once; workers map it by name instead
+# of receiving a pickled copy of the formula.
+import os
+import time
+import queue
+import multiprocessing as mp
+from array import array
+from multiprocessing import shared_memory
+
+import dimacs
+from cnf import CNF, decode
+from cardinality import expand_cards
+from CDCL import SATSolverCDCL
+from DPLL import SATSolverDPLL
+from DP import dp_solver, SAT, UNSAT
+
+UNKNOWN = "UNKNOWN"
+ERROR = "ERROR"
+POLL_INTERVAL = 0.05  # Seconds between checks for dead workers and the time limit
+
+# (name, engine, options); the first entries get a core first when there are
+# fewer cores than configurations
+DEFAULT_CONFIGS = [
+    ("cdcl-vsids-glucose", "cdcl", {"heuristic": "vsids", "restart": "glucose"}),
+    ("cdcl-vsids-luby", "cdcl", {"heuristic": "vsids", "restart": "luby"}),
+    ("cdcl-vsids-glucose-seed1", "cdcl", {"heuristic": "vsids", "restart": "glucose", "seed": 1}),
+    ("cdcl-vsids-luby-seed2", "cdcl", {"heuristic": "vsids", "restart": "luby", "seed": 2}),
+    ("dp", "dp", {}),
+    ("dpll", "dpll", {}),
+    ("cdcl-static-none", "cdcl", {"heuristic": "static", "restart": "none"}),
+]
+
+class SharedFormula:
+    # The arena words of a CNF in a named shared memory block; cardinality
+    # constraints are shared as clauses
+    def __init__(self, cnf):
+        cnf = expand_cards(cnf)
+        data = cnf.arena.data
+        self.nbytes = len(data) * data.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=max(self.nbytes, 1))
+        self.shm.buf[:self.nbytes] = data.tobytes()
+        # Everything a worker needs to rebuild the CNF; small enough to pickle
+        self.handle = (self.shm.name, self.nbytes, cnf.num_vars, cnf.declared_clauses, cnf.arena.clause_count)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_formula(handle):
+    # Worker side: rebuild a CNF from the shared block. The solvers modify their
+    # clause storage, so each worker takes one private copy of the words.
+    name, nbytes, num_vars, declared_clauses, clause_count = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        cnf = CNF(num_vars, declared_clauses)
+        cnf.arena.data = array('i', bytes(shm.buf[:nbytes]))
+        cnf.arena.clause_count = clause_count
+    finally:
+        shm.close()
+    return cnf
+
+def run_engine(engine, options, cnf):
+    # Returns (status, model) with model as signed DIMACS literals
+    if engine == "dp":
+        formula = [[decode(lit) for lit in clause] for clause in cnf.clauses()]
+        return dp_solver(formula, cnf.num_vars, **options)
+    if engine == "cdcl":
+        solver = SATSolverCDCL(verbose=False, **options)
+    elif engine == "dpll":
+        solver = SATSolverDPLL(verbose=False, **options)
+    else:
+        raise ValueError(f"Unknown engine '{engine}'. Choose 'cdcl', 'dpll' or 'dp'.")
+    solver.load(cnf)
+    solver.solve()
+    return (SAT, solver.model) if solver.model is not None else (UNSAT, None)
+
+def worker(name, engine, options, handle, results):
+    start = time.time()
+    try:
+        status, model = run_engine(engine, options, attach_formula(handle))
+    except Exception as e:
+        status, model = ERROR, str(e)
+    results.put((name, status, model, time.time() - start))
+
+def solve_portfolio(cnf, configs=DEFAULT_CONFIGS, jobs=None, time_limit=None):
+    # Run configs with at most jobs processes at a time. Returns a dict with the
+    # status (SAT, UNSAT or UNKNOWN), the model, the winning configuration, the
+    # wall time and one {"config", "status", "time"} entry per configuration
+    # (status "CANCELLED" for those stopped or never started).
+    jobs = jobs or os.cpu_count() or 1
+    start = time.time()
+    shared = SharedFormula(cnf)
+    results = mp.Queue()
+    pending = list(configs)
+    running = {}
+    outcome = {"status": UNKNOWN, "model": None, "winner": None, "time": 0.0, "results": []}
+    try:
+        while pending or running:
+            while pending and len(running) < jobs:
+                name, engine, options = pending.pop(0)
+                process = mp.Process(target=worker, args=(name, engine, options, shared.handle, results), daemon=True)
+                process.start()
+                running[name] = process
+            if time_limit is not None and time.time() - start >= time_limit:
+                break
+            try:
+                name, status, model, elapsed = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # A worker killed from outside (e.g. out of memory) never reports
+                for name, process in list(running.items()):
+                    if process.exitcode not in (None, 0):
+                        del running[name]
+                        outcome["results"].append({"config": name, "status": ERROR, "time": time.time() - start})
+                continue
+            running.pop(name).join()
+            outcome["results"].append({"config": name, "status": status, "time": elapsed})
+            if status in (SAT, UNSAT):
+                outcome.update(status=status, model=model, winner=name)
+                break
+    finally:
+        # Stop the losers right away; terminate() does not wait for them to notice
+        for name, process in running.items():
+            process.terminate()
+        for name, process in running.items():
+            process.join()
+            outcome["results"].append({"config": name, "status": "CANCELLED", "time": time.time() - start})
+        for name, engine, options in pending:
+            outcome["results"].append({"config": name, "status": "CANCELLED", "time": 0.0})
+        results.close()
+        shared.close()
+    outcome["time"] = time.time() - start
+    return outcome
+
+def main():
+    # Race the default portfolio on every .cnf/.cnf.txt file in the current folder
+    folder = os.getcwd()
+    files = [f for f in os.listdir(folder) if f.endswith('.cnf') or f.endswith('.cnf.txt')]
+    wins = {}
+    for filename in files:
+        print(f"\nProcessing {filename}...")
+        outcome = solve_portfolio(dimacs.load(os.path.join(folder, filename)))
+        print(f"Result: {outcome['status']} (winner: {outcome['winner']})")
+        for entry in outcome["results"]:
+            print(f"  {entry['config']:<26} {entry['status']:<10} {entry['time']:.4f}s")
+        print(f"Time taken: {outcome['time']:.4f} seconds")
+        if outcome["winner"] is not None:
+            wins[outcome["winner"]] = wins.get(outcome["winner"], 0) + 1
+    if wins:
+        print("\nWins per configuration:")
+        for name, count in sorted(wins.items(), key=lambda item: -item[1]):
+            print(f"  {name}: {count}")
+
+if __name__ == "__main__":
+    main()
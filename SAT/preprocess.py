@@ -0,0 +1,358 @@
+# Formula simplification before search: unit propagation, pure literals,
+# subsumption and self-subsuming strengthening, bounded variable elimination
+# (the clause-count-preserving version of the resolution step in DP.py) and
+# failed-literal probing. Works on the encoded literals of cnf.py; the reduced
+# formula keeps the original variable numbering, and the reconstruction stack
+# turns any model of it into a model of the input formula.
+import os
+import time
+from collections import deque
+
+import dimacs
+from cnf import CNF
+from cardinality import expand_cards
+from CDCL import Cat, SATSolverCDCL
+
+NOT_SUBSUMED = -2
+SUBSUMED = -1
+
+class Preprocessor:
+    def __init__(self, cnf, time_budget=5.0, occurrence_limit=16, resolvent_limit=20):
+        cnf = expand_cards(cnf)  # Cardinality constraints become clauses over auxiliary variables
+        self.num_vars = cnf.num_vars
+        self.time_budget = time_budget
+        self.occurrence_limit = occurrence_limit   # Skip elimination of variables with more occurrences per sign
+        self.resolvent_limit = resolvent_limit     # Skip elimination if a resolvent gets longer than this
+        self.clauses = []                          # Clause index -> literal list, None once removed
+        self.occurs = [set() for _ in range(2 * self.num_vars)]
+        self.values = bytearray(2 * self.num_vars)  # 1 for literals fixed to true
+        self.eliminated = bytearray(self.num_vars)
+        self.units = deque()
+        self.queue = deque()                       # Clauses to use for backward subsumption
+        self.queued = set()
+        self.reconstruction = []                   # (witness literal, clause) in elimination order
+        self.unsat = False
+        self.deadline = None
+        self.stats = {"units": 0, "pure": 0, "subsumed": 0, "strengthened": 0,
+                      "eliminated": 0, "failed": 0, "time": 0.0}
+        self.original = (cnf.num_vars, len(cnf), len(cnf.arena.data) - 3 * len(cnf))
+        for lits in cnf.clauses():
+            self.add_clause(lits.tolist())
+
+    def out_of_time(self):
+        return time.time() > self.deadline
+
+    def add_clause(self, lits):
+        clause = []
+        for lit in lits:
+            if self.values[lit ^ 1]:
+                continue
+            if self.values[lit] or lit ^ 1 in clause:
+                return None
+            if lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.unsat = True
+            return None
+        if len(clause) == 1:
+            self.units.append(clause[0])
+            return None
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        for lit in clause:
+            self.occurs[lit].add(index)
+        self.touch(index)
+        return index
+
+    def touch(self, index):
+        if index not in self.queued:
+            self.queued.add(index)
+            self.queue.append(index)
+
+    def remove_clause(self, index):
+        for lit in self.clauses[index]:
+            self.occurs[lit].discard(index)
+        self.clauses[index] = None
+
+    def strengthen(self, index, lit):
+        clause = self.clauses[index]
+        clause.remove(lit)
+        self.occurs[lit].discard(index)
+        self.stats["strengthened"] += 1
+        if len(clause) == 1:
+            self.units.append(clause[0])
+            self.remove_clause(index)
+        else:
+            self.touch(index)
+
+    def propagate(self):
+        while self.units and not self.unsat:
+            lit = self.units.popleft()
+            if self.values[lit]:
+                continue
+            if self.values[lit ^ 1]:
+                self.unsat = True
+                return
+            self.values[lit] = 1
+            self.reconstruction.append((lit, [lit]))
+            self.stats["units"] += 1
+            for index in list(self.occurs[lit]):
+                self.remove_clause(index)
+            for index in list(self.occurs[lit ^ 1]):
+                clause = self.clauses[index]
+                if len(clause) == 2:
+                    self.units.append(clause[0] if clause[1] == lit ^ 1 else clause[1])
+                    self.remove_clause(index)
+                else:
+                    clause.remove(lit ^ 1)
+                    self.occurs[lit ^ 1].discard(index)
+                    self.touch(index)
+
+    def active(self, var):
+        return not self.eliminated[var] and not self.values[2 * var] and not self.values[2 * var + 1]
+
+    def pure_literals(self):
+        occurs = self.occurs
+        for var in range(self.num_vars):
+            if not self.active(var):
+                continue
+            pos, neg = occurs[2 * var], occurs[2 * var + 1]
+            if bool(pos) == bool(neg):
+                continue
+            lit = 2 * var if pos else 2 * var + 1
+            self.reconstruction.append((lit, [lit]))
+            self.eliminated[var] = 1
+            self.stats["pure"] += 1
+            for index in list(occurs[lit]):
+                self.remove_clause(index)
+
+    def subsumption_check(self, clause, other):
+        # SUBSUMED if clause is a subset of other; a literal l of clause if clause
+        # with l negated is a subset (other can drop not-l); NOT_SUBSUMED otherwise
+        flipped = SUBSUMED
+        for lit in clause:
+            if lit in other:
+                continue
+            if flipped == SUBSUMED and lit ^ 1 in other:
+                flipped = lit
+                continue
+            return NOT_SUBSUMED
+        return flipped
+
+    def backward_subsume(self, index):
+        # Remove or strengthen every clause that this clause subsumes
+        clause = self.clauses[index]
+        occurs = self.occurs
+        best = min(clause, key=lambda l: len(occurs[l]) + len(occurs[l ^ 1]))
+        for other_index in list(occurs[best] | occurs[best ^ 1]):
+            other = self.clauses[other_index]
+            if other_index == index or other is None or len(other) < len(clause):
+                continue
+            result = self.subsumption_check(clause, set(other))
+            if result == SUBSUMED:
+                self.remove_clause(other_index)
+                self.stats["subsumed"] += 1
+            elif result != NOT_SUBSUMED:
+                self.strengthen(other_index, result ^ 1)
+            if self.clauses[index] is None:
+                return
+
+    def forward_subsumed(self, clause):
+        # Is the new clause subsumed by one already in the formula?
+        lits = set(clause)
+        for lit in clause:
+            for index in self.occurs[lit]:
+                other = self.clauses[index]
+                if len(other) <= len(clause) and all(l in lits for l in other):
+                    return True
+        return False
+
+    def subsume(self):
+        while self.queue and not self.unsat:
+            if self.out_of_time():
+                return
+            index = self.queue.popleft()
+            self.queued.discard(index)
+            if self.clauses[index] is not None:
+                self.backward_subsume(index)
+            self.propagate()
+
+    def resolvents(self, var, limit):
+        # Non-tautological resolvents on var, or None once there are more than limit
+        pos = [self.clauses[i] for i in self.occurs[2 * var]]
+        neg = [self.clauses[i] for i in self.occurs[2 * var + 1]]
+        result = []
+        for c1 in pos:
+            for c2 in neg:
+                resolvent = [l for l in c1 if l >> 1 != var]
+                seen = set(resolvent)
+                for l in c2:
+                    if l >> 1 == var or l in seen:
+                        continue
+                    if l ^ 1 in seen:
+                        break
+                    resolvent.append(l)
+                else:
+                    if len(resolvent) > self.resolvent_limit or len(result) == limit:
+                        return None
+                    result.append(resolvent)
+        return result
+
+    def eliminate(self):
+        # Bounded variable elimination: replace the clauses of a variable by their
+        # resolvents when that does not increase the clause count
+        occurs = self.occurs
+        order = sorted((v for v in range(self.num_vars) if self.active(v)),
+                       key=lambda v: len(occurs[2 * v]) * len(occurs[2 * v + 1]))
+        for var in order:
+            if self.unsat or self.out_of_time():
+                return
+            if not self.active(var):
+                continue
+            pos, neg = occurs[2 * var], occurs[2 * var + 1]
+            if not pos or not neg:
+                continue  # Left to pure literal elimination
+            if len(pos) > self.occurrence_limit and len(neg) > self.occurrence_limit:
+                continue
+            resolvents = self.resolvents(var, len(pos) + len(neg))
+            if resolvents is None:
+                continue
+            for lit in (2 * var, 2 * var + 1):
+                for index in list(occurs[lit]):
+                    self.reconstruction.append((lit, self.clauses[index]))
+                    self.remove_clause(index)
+            self.eliminated[var] = 1
+            self.stats["eliminated"] += 1
+            for resolvent in resolvents:
+                if not self.forward_subsumed(resolvent):
+                    self.add_clause(resolvent)
+            self.propagate()
+            self.subsume()
+
+    def probe(self, lit):
+        # Propagate lit over the current clauses; False if that leads to a conflict
+        assigned = {lit}
+        queue = [lit]
+        while queue:
+            false_lit = queue.pop() ^ 1
+            for index in self.occurs[false_lit]:
+                unassigned = None
+                for l in self.clauses[index]:
+                    if l in assigned:
+                        break
+                    if l ^ 1 in assigned:
+                        continue
+                    if unassigned is not None:
+                        break
+                    unassigned = l
+                else:
+                    if unassigned is None:
+                        return False
+                    assigned.add(unassigned)
+                    queue.append(unassigned)
+        return True
+
+    def failed_literals(self):
+        # Only literals occurring negated in binary clauses can imply anything quickly
+        for var in range(self.num_vars):
+            if self.unsat or self.out_of_time():
+                return
+            for lit in (2 * var, 2 * var + 1):
+                if not self.active(var):
+                    break
+                if not any(len(self.clauses[i]) == 2 for i in self.occurs[lit ^ 1]):
+                    continue
+                if not self.probe(lit):
+                    self.stats["failed"] += 1
+                    self.units.append(lit ^ 1)
+                    self.propagate()
+
+    def run(self):
+        # Simplify within the time budget; returns the reduced CNF (None if UNSAT)
+        start = time.time()
+        self.deadline = start + self.time_budget
+        self.propagate()
+        self.subsume()
+        if not self.unsat:
+            self.failed_literals()
+            self.subsume()
+        if not self.unsat:
+            self.eliminate()
+            self.pure_literals()
+            self.propagate()
+        self.stats["time"] = time.time() - start
+        if self.unsat:
+            return None
+        reduced = CNF(self.num_vars)
+        for clause in self.clauses:
+            if clause is not None:
+                reduced.add_clause(clause)
+        reduced.declared_clauses = len(reduced)
+        return reduced
+
+    def extend_model(self, model):
+        # Map a model of the reduced formula (signed DIMACS literals, one per
+        # variable) to a model of the original one
+        values = [lit > 0 for lit in model]
+        for witness, clause in reversed(self.reconstruction):
+            if not any(values[l >> 1] != bool(l & 1) for l in clause):
+                values[witness >> 1] = not witness & 1
+        return [i + 1 if value else -(i + 1) for i, value in enumerate(values)]
+
+    def report(self, reduced):
+        num_vars, clauses, literals = self.original
+        print(f"Preprocessing: {self.stats['time']:.3f}s")
+        if reduced is None:
+            print("  Formula refuted during preprocessing")
+        else:
+            remaining = sum(1 for v in range(num_vars) if self.occurs[2 * v] or self.occurs[2 * v + 1])
+            print(f"  variables {num_vars} -> {remaining}, clauses {clauses} -> {len(reduced)}, "
+                  f"literals {literals} -> {len(reduced.arena.data) - 3 * len(reduced)}")
+        print("  " + ", ".join(f"{k}: {v}" for k, v in self.stats.items() if k != "time"))
+
+def solve_preprocessed(solver, cnf, time_budget=5.0, verbose=True):
+    # Preprocess, run the solver on the reduced formula and extend its model
+    pre = Preprocessor(cnf, time_budget)
+    reduced = pre.run()
+    if verbose:
+        pre.report(reduced)
+    if reduced is None:
+        solver.result, solver.model = Cat.UNSATISFIED, None
+    else:
+        solver.verbose = False
+        solver.load(reduced)
+        solver.solve()
+        if solver.model is not None:
+            solver.model = pre.extend_model(solver.model)
+    if verbose:
+        if solver.model is not None:
+            print("SAT")
+            print(" ".join(map(str, solver.model)) + " 0")
+        else:
+            print("UNSAT")
+    return solver.model
+
+def main():
+    # Compare plain and preprocessed CDCL on every .cnf/.cnf.txt file in the current folder
+    folder = os.getcwd()
+    files = [f for f in os.listdir(folder) if f.endswith('.cnf') or f.endswith('.cnf.txt')]
+    for filename in files:
+        print(f"\nProcessing {filename}...")
+        cnf = dimacs.load(os.path.join(folder, filename))
+
+        start_time = time.time()
+        solver = SATSolverCDCL(verbose=False)
+        solver.load(cnf)
+        solver.solve()
+        plain = time.time() - start_time
+
+        start_time = time.time()
+        solve_preprocessed(SATSolverCDCL(), cnf, verbose=False)
+        preprocessed = time.time() - start_time
+
+        print(f"Result: {'SAT' if solver.model is not None else 'UNSAT'}")
+        print(f"Time without preprocessing: {plain:.4f} seconds")
+        print(f"Time with preprocessing: {preprocessed:.4f} seconds (saved {plain - preprocessed:.4f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Restart policies for SATSolverCDCL. The solver reports every conflict with
+# the LBD of the clause it learned and asks should_restart() before deciding.
+from collections import deque
+
+def luby(i):
+    # i-th element (1-based) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ...
+    size = 1
+    seq = 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    i -= 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i %= size
+    return 1 << seq
+
+class NoRestart:
+    def on_conflict(self, lbd):
+        pass
+
+    def should_restart(self):
+        return False
+
+    def on_restart(self):
+        pass
+
+class LubyRestart:
+    # Restart after unit * luby(k) conflicts in the k-th run
+    def __init__(self, unit=100):
+        self.unit = unit
+        self.runs = 1
+        self.conflicts = 0
+        self.limit = unit * luby(1)
+
+    def on_conflict(self, lbd):
+        self.conflicts += 1
+
+    def should_restart(self):
+        return self.conflicts >= self.limit
+
+    def on_restart(self):
+        self.runs += 1
+        self.conflicts = 0
+        self.limit = self.unit * luby(self.runs)
+
+class GlucoseRestart:
+    # Restart when the recent learned clauses are clearly worse than average:
+    # mean LBD of the last window conflicts * margin > mean LBD over the run
+    def __init__(self, window=50, margin=0.8):
+        self.recent = deque(maxlen=window)
+        self.recent_sum = 0
+        self.margin = margin
+        self.total_sum = 0
+        self.conflicts = 0
+
+    def on_conflict(self, lbd):
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_sum -= self.recent[0]
+        self.recent.append(lbd)
+        self.recent_sum += lbd
+        self.total_sum += lbd
+        self.conflicts += 1
+
+    def should_restart(self):
+        return (len(self.recent) == self.recent.maxlen and
+                self.recent_sum / len(self.recent) * self.margin > self.total_sum / self.conflicts)
+
+    def on_restart(self):
+        self.recent.clear()
+        self.recent_sum = 0
+
+RESTART_POLICIES = {
+    "none": NoRestart,
+    "luby": LubyRestart,
+    "glucose": GlucoseRestart,
+}
+
+def make_restart_policy(name):
+    if name not in RESTART_POLICIES:
+        raise ValueError(f"Unknown restart policy '{name}'. Choose from: {', '.join(RESTART_POLICIES)}.")
+    return RESTART_POLICIES[name]()
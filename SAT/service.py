@@ -0,0 +1,466 @@
+# Local solver service: an asyncio server on a Unix socket or localhost TCP that
+# runs CNF jobs on a pool of warm worker processes (solver modules imported
+# once, then one job after another). The protocol is one JSON object per line.
+#
+# Requests:
+#   {"op": "solve", "id": "j1", "cnf": "<DIMACS text>" | "path": "file.cnf",
+#    "solver": "cdcl", "options": {...}, "timeout": 10, "model": true}
+#   {"op": "cancel", "id": "j1"}
+# Replies, streamed in completion order and matched by id:
+#   {"id": "j1", "event": "queued"}
+#   {"id": "j1", "event": "result", "status": "SAT", "model": [...], "stats": {...}, "time": 0.01}
+#   status is SAT, UNSAT, UNKNOWN, TIMEOUT, CANCELLED, MEMOUT or ERROR (with "error");
+#   when the queue is full a solve request is answered with status BUSY right away.
+#
+#   python service.py serve --socket /tmp/sat.sock --workers 4
+#   python service.py bench --jobs 200    jobs/s and latency against one process per job
+#   python service.py check               cancellation, shutdown and large message scenarios
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing as mp
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import dimacs
+from benchmark import run_solver, TIMEOUT, MEMOUT, ERROR
+
+CANCELLED = "CANCELLED"
+BUSY = "BUSY"
+DEFAULT_QUEUE = 256
+DEFAULT_TIMEOUT = 60.0
+SOLVERS = ("cdcl", "dpll", "dp", "sls")
+
+def worker_main(conn, memory_limit):
+    # Worker process: solve jobs from conn until it is closed
+    if resource is not None and memory_limit:
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        try:
+            solver, options, text, path, want_model = conn.recv()
+        except EOFError:
+            return
+        start = time.perf_counter()
+        reply = {}
+        try:
+            cnf = dimacs.load(path) if path is not None else dimacs.parse_lines([text])
+            status, model, stats = run_solver(solver, options, cnf)
+            reply.update(status=status, stats=stats)
+            if want_model:
+                reply["model"] = model
+        except MemoryError:
+            reply["status"] = MEMOUT
+        except Exception as e:
+            reply.update(status=ERROR, error=f"{type(e).__name__}: {e}")
+        reply["time"] = time.perf_counter() - start
+        conn.send(reply)
+
+class Worker:
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.start()
+
+    def start(self):
+        self.conn, child = mp.Pipe()
+        self.process = mp.Process(target=worker_main, args=(child, self.memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+        self.io = None                   # Pipe transfer running in a thread, if any
+
+    async def transfer(self, function, *args):
+        # A blocking pipe operation (a large CNF or model takes a while) in a
+        # thread. Shielded: when the job is cancelled the thread goes on until
+        # the process is killed, and the pipe is only closed after collect()
+        self.io = asyncio.get_running_loop().run_in_executor(None, function, *args)
+        return await asyncio.shield(self.io)
+
+    async def collect(self):
+        if self.io is not None:
+            await asyncio.gather(self.io, return_exceptions=True)
+
+    async def solve(self, message):
+        # Send a job and wait for its reply without blocking the event loop
+        await self.transfer(self.conn.send, message)
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(fd)
+        return await self.transfer(self.conn.recv)
+
+    async def restart(self):
+        # The only way to stop a solve midway: kill the process, start a fresh one
+        self.process.kill()
+        await self.collect()
+        self.process.join()
+        self.conn.close()
+        self.start()
+
+    async def stop(self):
+        if self.io is not None and not self.io.done():
+            self.process.kill()
+            await self.collect()
+        self.conn.close()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+class Job:
+    def __init__(self, request, reply):
+        self.id = request.get("id")
+        self.request = request
+        self.reply = reply               # Sends a result dict back to the client
+        self.cancelled = False
+        self.waiter = None               # Task waiting for the worker while the job runs
+
+class SolverService:
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE, default_timeout=DEFAULT_TIMEOUT, memory_limit=2048):
+        self.num_workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue()      # Cancelled jobs stay in it until a runner skips them
+        self.queue_size = queue_size
+        self.queued = 0                  # Jobs in the queue that are not cancelled
+        self.default_timeout = default_timeout
+        self.memory_limit = memory_limit
+        self.workers = []
+        self.runners = []
+        self.jobs = {}                   # (connection, job id) -> Job, queued or running
+        self.server = None
+        self.connections = {}            # Handler task -> stream writer of every open client connection
+        self.completed = 0
+        self.closing = False
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        self.workers = [Worker(self.memory_limit) for _ in range(self.num_workers)]
+        self.runners = [asyncio.create_task(self.run(worker)) for worker in self.workers]
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=path, limit=1 << 30)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=1 << 30)
+        return self.server
+
+    async def close(self):
+        # Set first: a job cancelled by a closing connection must not be taken
+        # for a client cancel, which the runner would answer and carry on
+        self.closing = True
+        self.server.close()
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        for runner in self.runners:
+            runner.cancel()
+        await asyncio.gather(*self.runners, return_exceptions=True)
+        for worker in self.workers:
+            await worker.stop()
+
+    async def run(self, worker):
+        # One runner per worker: take a job, send it, wait for the reply
+        while True:
+            job = await self.queue.get()
+            if job.cancelled:
+                continue  # Cancelled while queued: already answered and uncounted
+            self.queued -= 1
+            request = job.request
+            timeout = request.get("timeout", self.default_timeout)
+            message = (request.get("solver", "cdcl"), request.get("options", {}), request.get("cnf"),
+                       request.get("path"), request.get("model", True))
+            job.waiter = asyncio.ensure_future(asyncio.wait_for(worker.solve(message), timeout))
+            try:
+                reply = await job.waiter
+            except asyncio.TimeoutError:
+                await worker.restart()
+                reply = {"status": TIMEOUT, "time": timeout}
+            except asyncio.CancelledError:
+                if self.closing or not job.cancelled:
+                    raise  # The service is shutting down
+                await worker.restart()
+                reply = {"status": CANCELLED}
+            except (EOFError, OSError):
+                # The worker died, e.g. killed by the OS
+                await worker.restart()
+                reply = {"status": ERROR, "error": "worker process died"}
+            job.reply(dict(reply, event="result"))
+            self.completed += 1
+
+    def cancel(self, key):
+        job = self.jobs.get(key)
+        if job is None or job.cancelled:
+            return False
+        job.cancelled = True
+        if job.waiter is not None:
+            job.waiter.cancel()
+        else:
+            self.queued -= 1
+            job.reply({"event": "result", "status": CANCELLED})
+        return True
+
+    async def handle(self, reader, writer):
+        # One client connection; requests on it may be answered out of order
+        connection = object()
+        self.connections[asyncio.current_task()] = writer
+
+        def send(message):
+            if not writer.is_closing():
+                writer.write(json.dumps(message).encode() + b'\n')
+
+        def make_reply(key):
+            def reply(message):
+                self.jobs.pop(key, None)
+                send(dict(message, id=key[1]))
+            return reply
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    send({"event": "error", "error": "malformed JSON"})
+                    continue
+                op = request.get("op", "solve")
+                key = (connection, request.get("id"))
+                if op == "cancel":
+                    if not self.cancel(key):
+                        send({"id": key[1], "event": "error", "error": "no such job"})
+                elif op != "solve":
+                    send({"id": key[1], "event": "error", "error": f"unknown op '{op}'"})
+                elif request.get("solver", "cdcl") not in SOLVERS:
+                    send({"id": key[1], "event": "result", "status": ERROR,
+                          "error": f"unknown solver, choose from: {', '.join(SOLVERS)}"})
+                elif key in self.jobs:
+                    send({"id": key[1], "event": "error", "error": "duplicate job id"})
+                elif self.queued >= self.queue_size:
+                    # Backpressure: refuse rather than buffer without bound
+                    send({"id": key[1], "event": "result", "status": BUSY})
+                else:
+                    job = Job(request, make_reply(key))
+                    self.jobs[key] = job
+                    self.queued += 1
+                    self.queue.put_nowait(job)
+                    send({"id": key[1], "event": "queued"})
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Jobs of a client that went away are not worth finishing
+            for key in [key for key in self.jobs if key[0] is connection]:
+                self.cancel(key)
+            writer.close()
+            del self.connections[asyncio.current_task()]
+
+async def solve_many(address, jobs, window):
+    # Client side: send (id, request) jobs with at most window outstanding,
+    # resending BUSY ones. Returns {id: (reply, seconds from first send)}.
+    if isinstance(address, str):
+        reader, writer = await asyncio.open_unix_connection(address, limit=1 << 30)
+    else:
+        reader, writer = await asyncio.open_connection(*address, limit=1 << 30)
+    pending = list(jobs)
+    requests = dict(jobs)
+    sent = {}
+    results = {}
+    while pending or sent:
+        while pending and len(sent) < window:
+            job_id, request = pending.pop(0)
+            sent.setdefault(job_id, time.perf_counter())
+            writer.write(json.dumps(dict(request, id=job_id)).encode() + b'\n')
+        await writer.drain()
+        message = json.loads(await reader.readline())
+        if message.get("event") != "result":
+            continue
+        job_id = message["id"]
+        if message["status"] == BUSY:
+            pending.append((job_id, requests[job_id]))
+            del sent[job_id]
+            await asyncio.sleep(0.01)
+            continue
+        results[job_id] = (message, time.perf_counter() - sent.pop(job_id))
+    writer.close()
+    return results
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+def bench(num_jobs, num_vars, workers):
+    # Many small random 3-SAT jobs: one `python CDCL.py` process per job (the CLI
+    # way, model printed to stdout) against the service
+    from incremental import random_3sat
+    texts = ["".join(random_3sat(num_vars, 4.0, seed)) for seed in range(num_jobs)]
+    here = os.path.dirname(os.path.abspath(__file__))
+    latencies = []
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as folder:
+        for seed, text in enumerate(texts):
+            job_folder = os.path.join(folder, str(seed))
+            os.mkdir(job_folder)
+            with open(os.path.join(job_folder, "job.cnf.txt"), "w") as file:
+                file.write(text)
+            job_start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(here, "CDCL.py")], cwd=job_folder, check=True,
+                           stdout=subprocess.DEVNULL)
+            latencies.append(time.perf_counter() - job_start)
+    elapsed = time.perf_counter() - start
+    print(f"{num_jobs} jobs of random 3-SAT with {num_vars} variables")
+    print(f"Process per job: {num_jobs / elapsed:.1f} jobs/s, p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+
+    async def run_service():
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "sat.sock")
+            service = SolverService(workers)
+            await service.start(path)
+            try:
+                jobs = [(str(i), {"cnf": text, "solver": "cdcl"}) for i, text in enumerate(texts)]
+                start = time.perf_counter()
+                results = await solve_many(path, jobs, 2 * service.num_workers)
+                return results, time.perf_counter() - start
+            finally:
+                await service.close()
+
+    results, elapsed = asyncio.run(run_service())
+    latencies = [seconds for _, seconds in results.values()]
+    statuses = {}
+    for message, _ in results.values():
+        statuses[message["status"]] = statuses.get(message["status"], 0) + 1
+    print(f"Service ({workers or os.cpu_count()} workers): {num_jobs / elapsed:.1f} jobs/s, "
+          f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms "
+          f"({', '.join(f'{status} {count}' for status, count in sorted(statuses.items()))})")
+
+def check():
+    # Scenarios the benchmark does not reach, each against a fresh one-worker
+    # service. Returns the number of failures.
+    from incremental import random_3sat
+    hard = "".join(random_3sat(120, 4.26, 1))      # Minutes for DP: still running when cancelled
+    units = 200000
+    large = f"p cnf {units} {units}\n" + "".join(f"{v} 0\n" for v in range(1, units + 1))
+
+    async def connect(path):
+        reader, writer = await asyncio.open_unix_connection(path, limit=1 << 30)
+
+        async def request(message, event):
+            writer.write(json.dumps(message).encode() + b'\n')
+            await writer.drain()
+            while True:
+                reply = json.loads(await reader.readline())
+                if reply.get("event") == event:
+                    return reply
+        return writer, request
+
+    async def disconnect_then_close(service, path):
+        # The shutdown cancel must not be taken for the job cancel of the
+        # client that went away, or close() waits forever
+        writer, request = await connect(path)
+        await request({"id": "a", "cnf": hard, "solver": "dp"}, "queued")
+        await asyncio.sleep(0.5)
+        writer.close()
+        await asyncio.wait_for(service.close(), 10)
+        return True
+
+    async def cancelled_frees_slot(service, path):
+        writer, request = await connect(path)
+        await request({"id": "a", "cnf": hard, "solver": "dp"}, "queued")
+        await request({"id": "b", "cnf": hard, "solver": "dp"}, "queued")
+        cancelled = await request({"op": "cancel", "id": "b"}, "result")
+        reply = await request({"id": "c", "cnf": hard, "solver": "dp"}, "queued")
+        writer.close()
+        await asyncio.wait_for(service.close(), 10)
+        return cancelled["status"] == CANCELLED and reply.get("status") != BUSY
+
+    async def large_job(service, path):
+        # Megabytes each way through the worker pipe, the event loop kept free
+        writer, request = await connect(path)
+        stalled = 0.0
+
+        async def tick():
+            nonlocal stalled
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(0.01)
+                stalled = max(stalled, time.perf_counter() - before - 0.01)
+        ticker = asyncio.create_task(tick())
+        reply = await request({"id": "a", "cnf": large}, "result")
+        ticker.cancel()
+        writer.close()
+        await asyncio.wait_for(service.close(), 10)
+        print(f"  longest event loop stall {stalled * 1000:.0f} ms")
+        return reply["status"] == "SAT" and len(reply["model"]) == units
+
+    async def run(scenario):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "sat.sock")
+            service = SolverService(1, queue_size=1)
+            await service.start(path)
+            try:
+                return await asyncio.wait_for(scenario(service, path), 120)
+            except asyncio.TimeoutError:
+                for worker in service.workers:
+                    worker.process.kill()
+                return False
+
+    failures = 0
+    for scenario in (disconnect_then_close, cancelled_frees_slot, large_job):
+        ok = asyncio.run(run(scenario))
+        print(f"{scenario.__name__}: {'ok' if ok else 'FAILED'}")
+        failures += not ok
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SAT solver service.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the service until interrupted")
+    serve.add_argument("--socket", help="Unix socket path (default: TCP on --host/--port)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    serve.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="queued jobs before new ones get BUSY")
+    serve.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="default seconds per job")
+    serve.add_argument("--memory", type=int, default=2048, help="address space limit per worker in MiB (0: none)")
+    benchmark = commands.add_parser("bench", help="compare with one CLI process per job")
+    benchmark.add_argument("--jobs", type=int, default=200)
+    benchmark.add_argument("--vars", type=int, default=50)
+    benchmark.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    commands.add_parser("check", help="cancellation, shutdown and large message scenarios")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.jobs, args.vars, args.workers)
+        return
+    if args.command == "check":
+        sys.exit(1 if check() else 0)
+
+    async def serve_forever():
+        service = SolverService(args.workers, args.queue, args.timeout, args.memory)
+        if args.socket:
+            server = await service.start(args.socket)
+            print(f"Listening on {args.socket} with {service.num_workers} workers")
+        else:
+            server = await service.start(host=args.host, port=args.port)
+            print(f"Listening on {args.host}:{args.port} with {service.num_workers} workers")
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# Instrumentation shared by the engines: a statistics object with search
+# counters and time per phase, rate-limited progress reporting, and opt-in
+# profiling of a whole solve (cProfile or a sampling thread). Profiling is only
+# set up when asked for, so a solver without it runs exactly as before.
+import sys
+import time
+import threading
+import cProfile
+import pstats
+import io
+from contextlib import contextmanager
+
+class SolverStats:
+    # Counters an engine does not have stay at zero
+    def __init__(self):
+        self.decisions = 0
+        self.propagations = 0         # Assigned literals processed by propagation
+        self.conflicts = 0
+        self.restarts = 0
+        self.reductions = 0           # Learned clause database reductions
+        self.learned_clauses = 0
+        self.learned_literals = 0
+        self.lbd_sum = 0
+        self.max_learned_size = 0
+        self.peak_learned_clauses = 0
+        self.peak_learned_bytes = 0
+        self.resolvents = 0           # DP: non-tautological resolvents generated
+        self.eliminated = 0           # DP: variables eliminated by resolution
+        self.flips = 0                # SLS: variable flips
+        self.components = 0           # #SAT: independent components counted
+        self.cache_hits = 0           # #SAT: component counts found in the cache
+        self.cache_misses = 0
+        self.peak_cache_bytes = 0
+        self.phase_time = {}          # Phase name -> seconds
+        self.solve_time = 0.0
+        self.profile = None           # Report text of an opt-in profiling run
+
+    def add_time(self, phase, seconds):
+        self.phase_time[phase] = self.phase_time.get(phase, 0.0) + seconds
+
+    def on_learned(self, size, lbd):
+        self.learned_clauses += 1
+        self.learned_literals += size
+        self.lbd_sum += lbd
+        if size > self.max_learned_size:
+            self.max_learned_size = size
+
+    def average_learned_size(self):
+        return self.learned_literals / self.learned_clauses if self.learned_clauses else 0.0
+
+    def average_lbd(self):
+        return self.lbd_sum / self.learned_clauses if self.learned_clauses else 0.0
+
+    def as_dict(self):
+        # Flat dict for benchmark results
+        result = {name: value for name, value in vars(self).items() if name not in ("phase_time", "profile")}
+        result["average_learned_size"] = self.average_learned_size()
+        result["average_lbd"] = self.average_lbd()
+        for phase, seconds in self.phase_time.items():
+            result[f"time_{phase}"] = seconds
+        return result
+
+    def summary(self):
+        parts = [f"decisions {self.decisions}", f"propagations {self.propagations}", f"conflicts {self.conflicts}"]
+        if self.restarts:
+            parts.append(f"restarts {self.restarts}")
+        if self.learned_clauses:
+            parts.append(f"learned {self.learned_clauses} (avg size {self.average_learned_size():.1f}, "
+                         f"avg LBD {self.average_lbd():.1f})")
+        if self.flips:
+            parts.append(f"flips {self.flips}")
+        if self.cache_hits or self.cache_misses:
+            lookups = self.cache_hits + self.cache_misses
+            parts.append(f"components {self.components}, cache hits {self.cache_hits}/{lookups} "
+                         f"(peak {self.peak_cache_bytes / 1024:.1f} KiB)")
+        if self.resolvents:
+            parts.append(f"resolvents {self.resolvents}, eliminated {self.eliminated}")
+        if self.phase_time:
+            parts.append("time " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phase_time.items()))
+        return "; ".join(parts)
+
+class Progress:
+    # Calls callback(stats) at most once per interval seconds. tick() is cheap
+    # enough for the search loop: it only reads the clock every check_every calls.
+    def __init__(self, callback, stats, interval=1.0, check_every=256):
+        self.callback = callback
+        self.stats = stats
+        self.interval = interval
+        self.check_every = check_every
+        self.countdown = check_every
+        self.start = time.perf_counter()
+        self.base = stats.solve_time       # Time of earlier solve() calls on the same solver
+        self.next_report = self.start + interval
+
+    def tick(self):
+        self.countdown -= 1
+        if self.countdown:
+            return
+        self.countdown = self.check_every
+        now = time.perf_counter()
+        if now >= self.next_report:
+            self.next_report = now + self.interval
+            self.stats.solve_time = self.base + now - self.start
+            self.callback(self.stats)
+
+def print_progress(stats):
+    # Default progress callback: one line to stderr
+    print(f"[{stats.solve_time:8.1f}s] {stats.summary()}", file=sys.stderr)
+
+def make_progress(callback, stats, interval):
+    if callback is None:
+        return None
+    return Progress(print_progress if callback is True else callback, stats, interval)
+
+class Sampler:
+    # Statistical profiler: a background thread records the function on top of
+    # the profiled thread's stack every interval seconds
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self.thread_id = threading.get_ident()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            code = frame.f_code
+            key = f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno}({code.co_name})"
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def report(self, top=15):
+        lines = [f"{self.samples} samples"]
+        for key, count in sorted(self.counts.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"{100.0 * count / max(self.samples, 1):6.1f}%  {key}")
+        return "\n".join(lines)
+
+@contextmanager
+def profiling(mode, stats, top=15):
+    # mode None: no profiling at all; "cprofile" or "sampling": the report of the
+    # enclosed code ends up in stats.profile
+    if mode is None:
+        yield
+        return
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("tottime").print_stats(top)
+            stats.profile = out.getvalue()
+    elif mode == "sampling":
+        sampler = Sampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            stats.profile = sampler.report(top)
+    else:
+        raise ValueError(f"Unknown profiling mode '{mode}'. Choose 'cprofile' or 'sampling'.")
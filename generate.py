@@ -1,17 +1,14 @@
-import random
+import os
+import sys
 
-def generate_large_cnf(filename="example4.cnf.txt", num_vars=500000, num_clauses=2500000, clause_len_range=(3, 5)):
-    with open(filename, 'w') as f:
-        f.write(f"c Generated CNF with {num_vars} vars, {num_clauses} clauses\n")
-        f.write(f"p cnf {num_vars} {num_clauses}\n")
-        for _ in range(num_clauses):
-            clause_len = random.randint(*clause_len_range)
-            clause = set()
-            while len(clause) < clause_len:
-                var = random.randint(1, num_vars)
-                sign = random.choice([-1, 1])
-                clause.add(sign * var)
-            f.write(" ".join(map(str, clause)) + " 0\n")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "SAT"))
+from generators import random_clauses, write_cnf
 
-generate_large_cnf()
-print("example1.txt generated.")
+def generate_large_cnf(filename="example4.cnf.txt", num_vars=500000, num_clauses=2500000, clause_len_range=(3, 5), seed=0):
+    # Random clauses with lengths drawn from clause_len_range, reproducible for a seed
+    write_cnf(filename, num_vars, num_clauses, random_clauses(num_vars, num_clauses, clause_len_range, seed),
+              comments=[f"Generated CNF with {num_vars} vars, {num_clauses} clauses, seed {seed}"])
+
+if __name__ == "__main__":
+    generate_large_cnf()
+    print("example4.cnf.txt generated.")